@@ -39,26 +39,56 @@ CHANGELOG
 from xbmcswift2 import xbmc
 from xbmcswift2 import xbmcgui
 
+from contextlib import contextmanager
 import functools
-import operator
+import importlib
 import os
 import sys
 import time
+import urlparse
 import xbmcswift2
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'resources', 'lib'))
 
-import pybongtvapi
 
-plugin = xbmcswift2.Plugin()
-addon_icon = plugin.addon.getAddonInfo('icon')
-addon_name = plugin.addon.getAddonInfo('name')
+class LazyModule(object):
+    # imports the module on first attribute access: kodi starts this script for every click and routes like
+    # page_index never need pybongtvapi
+
+    def __init__(self, name, on_import=None):
+        self._name = name
+        self._on_import = on_import
+        self._module = None
+
+    def __getattr__(self, name):
+        if self._module is None:
+            module = importlib.import_module(self._name)
+            if self._on_import is not None:
+                self._on_import(module)
+            self._module = module
+        return getattr(self._module, name)
+
+
+def configure_common(module):
+    module.configure(plugin.storage_path)
 
-pybongtvapi.DEFAULT_COOKIE_DIR = os.path.join(plugin.storage_path, '..', '.pybongtvapi', 'cookies')
+
+def configure_pybongtvapi(module):
+    common.configure(plugin.storage_path)  # whichever of the two is imported first
+
+
+common = LazyModule('common', on_import=configure_common)
+pybongtvapi = LazyModule('pybongtvapi', on_import=configure_pybongtvapi)
+
+plugin = xbmcswift2.Plugin()
+# the invoked route without its arguments, e.g. "/epg/channel", names this invocation's timings in the metrics
+route = '/' + '/'.join(urlparse.urlsplit(sys.argv[0]).path.strip('/').split('/')[:2])
 
 CONTENT_TYPES = VIDEOS, EPISODES, MOVIES = 'videos', 'episodes', 'movies'
+IMAGE_PREFETCH_TIMEOUT = 10  # seconds
 
 # xbmc translation identifiers
+XBMC_TR_OK = 186  # en: OK
 # the addon's translation identifiers
 TR_AUTHORIZATION_ERROR = 30000  # en: Authorization Error! de: Anmeldung fehlgeschlagen!
 TR_UPDATE_CREDENTIALS = 30001 # en: Please update your BONG.TV username and password, de: Bitte bong.tv-Benutzernamen und -Passwort aktualisieren
@@ -76,27 +106,81 @@ TR_TITLE_RECORD_BROADCAST = 30012  # en: Record broadcast? de: Aufnahme tätigen
 TR_RECORD_BROADCAST = 30013  # en: Record broadcast "{0}"? de: Sendung "{0}" aufzeichnen?
 TR_CANNOT_RECORD_BROADCAST = 30014  # en: Cannot record broadcast "{0}"! de: "{0}" kann nicht aufgezeichnet werden!
 TR_WILL_RECORD_BROADCAST = 30015  # en: "{0}" is scheduled for recording de: "{0}" wird aufgezeichnet
-TR_NEXT_DAYS_BROADCASTS = 30016  # en: Broadcasts from {0} de: Sendungen vom {0}
-TR_PREVIOUS_DAYS_BROADCASTS = 30017  # en: Broadcasts from {0} de: Sendungen vom {0}
+TR_LATER_BROADCASTS = 30016  # en: Broadcasts from {0} de: Sendungen vom {0}
+TR_EARLIER_BROADCASTS = 30017  # en: Broadcasts from {0} de: Sendungen vom {0}
 TR_LIST_OF_BROADCASTS = 30018  # en: List of channels de: Senderliste
 TR_TITLE_SEARCH_MATCHING_BROADCASTS = 30019  # en: Search broadcasts de: Suche Sendungen
 TR_X_MATCHING_BROADCASTS_FOUND = 30020 # en: Found {0} matching broadcasts for search term "{1}" de: {0} passende Sendungen für den Suchbegriff "{1}" gefunden
 TR_NO_MATCHING_BROADCASTS_FOUND = 30021  # en: No matching broadcasts found for search term "{0}" de: Keine passenden Sendungen für den Suchbegriff "{0}" gefunden!
+TR_NOW_AND_NEXT = 30022  # en: What's on now de: Was läuft gerade
+TR_NEXT_BROADCAST = 30023  # en: Next: {0} de: Danach: {0}
+TR_DELETE_SEVERAL_RECORDINGS = 30024  # en: Delete several recordings de: Mehrere Aufnahmen löschen
+TR_DELETE_RECORDINGS_OLDER_THAN_X_DAYS = 30025  # en: Delete recordings older than {0} days de: Aufnahmen löschen, die älter als {0} Tage sind
+TR_DELETE_X_RECORDINGS = 30026  # en: Delete {0} recordings? de: {0} Aufnahmen löschen?
+TR_X_OF_Y_RECORDINGS_DELETED = 30027  # en: {0} of {1} recordings deleted de: {0} von {1} Aufnahmen gelöscht
+TR_RECORD_SEVERAL_BROADCASTS = 30028  # en: Record several broadcasts de: Mehrere Sendungen aufnehmen
+TR_RECORD_X_BROADCASTS = 30029  # en: Record {0} broadcasts? de: {0} Sendungen aufnehmen?
+TR_X_OF_Y_BROADCASTS_SCHEDULED = 30030  # en: {0} of {1} broadcasts scheduled for recording de: {0} von {1} Sendungen werden aufgezeichnet
+TR_NEXT_PAGE = 30031  # en: Next page ({0}/{1}) de: Nächste Seite ({0}/{1})
+TR_BONGTV_UNAVAILABLE = 30032  # en: bong.tv is not reachable at the moment de: bong.tv ist im Moment nicht erreichbar
 
 
 # xbmc utils/helpers
+settings = dict()  # (setting_id, converter) --> value, kodi is asked once per invocation only
+
+
+def get_setting(setting_id, converter=str):
+    key = (setting_id, converter)
+    if key not in settings:
+        settings[key] = plugin.get_setting(setting_id, converter=converter)
+    return settings[key]
+
+
 def get_view_mode_id():
-    if plugin.get_setting('force_view_mode', converter=bool):
-        return plugin.get_setting('view_mode_id', converter=int)
+    if get_setting('force_view_mode', converter=bool):
+        return get_setting('view_mode_id', converter=int)
 
 
 def get_content_type():
-    if plugin.get_setting('force_content_type', converter=bool):
-        return plugin.get_setting('content_type', converter=str)
+    if get_setting('force_content_type', converter=bool):
+        return get_setting('content_type', converter=str)
 
 
 def use_extended_broadcast_details():
-    return plugin.get_setting('use_extended_broadcast_details', converter=bool)
+    return get_setting('use_extended_broadcast_details', converter=bool)
+
+
+def get_image_cache_size():
+    return get_setting('image_cache_size', converter=int) * 1024 * 1024
+
+
+def get_delete_recordings_older_than_days():
+    return get_setting('delete_recordings_older_than_days', converter=int)
+
+
+def collect_metrics():
+    return get_setting('collect_metrics', converter=bool)
+
+
+def get_page_size():
+    return max(get_setting('page_size', converter=int), 1)
+
+
+def get_time_slot(timestamp):
+    # (start, end) of the EPG page timestamp falls into, the pages split every day into slots of epg_slot_hours
+    hours = max(get_setting('epg_slot_hours', converter=int), 1)
+    day, hour = time.localtime(timestamp)[:3], time.localtime(timestamp).tm_hour // hours * hours
+    return (int(time.mktime(day + (hour, 0, 0, 0, 0, -1))),
+            int(time.mktime(day + (hour + hours, 0, 0, 0, 0, -1))))  # mktime() takes hour 24 as the next day
+
+
+def get_transport_policy():
+    # the time budget covers all requests of one invocation, see new_api()
+    return common.get_transport_policy(get_setting, budget=get_setting('time_budget', converter=int) or None)
+
+
+def get_broadcast_details_workers():
+    return get_setting('broadcast_details_workers', converter=int) or pybongtvapi.DEFAULT_MAX_WORKERS
 
 
 def normalize_title(broadcast, include_time=True, include_channel_name=False):
@@ -115,7 +199,8 @@ def new_broadcast_item(broadcast, path=None, include_time=True, include_channel_
         year=broadcast.production_year,
         episode=broadcast.episode,
         season=broadcast.season,
-        plot=broadcast.plot if use_extended_broadcast_details() else broadcast.outline,
+        plot=(broadcast.plot if use_extended_broadcast_details() and broadcast.has_broadcast_details() else
+              broadcast.outline),
         plotoutline=broadcast.outline,
         title=broadcast.subtitle if broadcast.is_tvshow() else broadcast.title,
         duration=broadcast.duration,
@@ -123,8 +208,9 @@ def new_broadcast_item(broadcast, path=None, include_time=True, include_channel_
         tvshowtitle=broadcast.title if broadcast.is_tvshow() else None,
         aired=time.strftime('%Y-%m-%d', broadcast.starts_at),
     )
-    properties = dict(fanart_image=broadcast.thumb_url)
-    return dict(label=label, label2=broadcast.subtitle, icon=broadcast.channel_logo_url, thumbnail=broadcast.thumb_url,
+    thumb_url = get_image(broadcast.thumb_url)
+    properties = dict(fanart_image=thumb_url)
+    return dict(label=label, label2=broadcast.subtitle, icon=get_image(broadcast.channel_logo_url), thumbnail=thumb_url,
                 path=path, properties=properties, info=broadcast_details, info_type='video')
 
 
@@ -139,18 +225,44 @@ def new_recording_item(recording, path=None, include_time=True, include_channel_
 
 
 def new_channel_item(channel, path):
-    return dict(label=channel.name, icon=channel.logo_url, thumbnail=channel.logo_url, path=path, info_type='video')
+    logo_url = get_image(channel.logo_url)
+    return dict(label=channel.name, icon=logo_url, thumbnail=logo_url, path=path, info_type='video')
+
+
+def paginate(items, endpoint, **kw):
+    # returns the items on the requested page (?page=) and the list item leading to the next page (or None)
+    page, page_size = int(plugin.request.args.get('page', ['0'])[0]), get_page_size()
+    pages = (len(items) + page_size - 1) // page_size
+    next_page_item = None
+    if page + 1 < pages:
+        next_page_item = dict(label=tr(TR_NEXT_PAGE, page + 2, pages),
+                              path=plugin.url_for(endpoint, page=str(page + 1), **kw))
+    return items[page * page_size:(page + 1) * page_size], next_page_item
+
+
+@contextmanager
+def timer(name):
+    # timings are only taken if they are collected, so that routes without requests do not import pybongtvapi
+    if collect_metrics():
+        with pybongtvapi.metrics.timer(name):
+            yield
+    else:
+        yield
 
 
 def finish(items, content_type=None, view_mode_id=None):
+    with timer('route_items ' + route):
+        items = tuple(items)
     if content_type in CONTENT_TYPES or get_content_type():
         plugin.set_content(content_type if content_type in CONTENT_TYPES else get_content_type())
-    return plugin.finish(items, view_mode=view_mode_id or get_view_mode_id())
+    with timer('route_finish ' + route):
+        return plugin.finish(items, view_mode=view_mode_id or get_view_mode_id())
 
 
 def notify(msg):
     if msg and isinstance(msg, basestring):
-        xbmc.executebuiltin('Notification("' + addon_name + '", "' + msg + '", "5000", "' + addon_icon + '")')
+        xbmc.executebuiltin('Notification("' + plugin.addon.getAddonInfo('name') + '", "' + msg + '", "5000", "' +
+                            plugin.addon.getAddonInfo('icon') + '")')
 
 
 def refresh_view(msg=None):
@@ -167,39 +279,111 @@ def update_view(url, msg=None):
     xbmc.executebuiltin('Container.Update(' + url + ')')
 
 
+def multiselect(heading, options):
+    # Dialog.multiselect() is new in Kodi 16, older versions toggle the options one by one in a select() dialog
+    # until OK (the first entry) is chosen. Returns the selected indices or None if the dialog was cancelled.
+    dialog = xbmcgui.Dialog()
+    if hasattr(dialog, 'multiselect'):
+        return dialog.multiselect(heading, options)
+    selected = set()
+    while True:
+        i = dialog.select(heading, [xbmc.getLocalizedString(XBMC_TR_OK).encode('utf-8')] + [
+            ('[X] ' if j in selected else '[  ] ') + option for j, option in enumerate(options)])
+        if i < 0:
+            return None
+        elif i == 0:
+            return sorted(selected)
+        selected.symmetric_difference_update([i - 1])
+
+
 def tr(msg_id, *a, **kw):
     return (plugin.get_string(int(msg_id)) or '').encode('utf-8').format(*a, **kw)
 
 
 # bong.tv utils/helpers
+api = None
+search_index = None
+image_cache = None
+
+
+def get_search_index():
+    global search_index
+    if search_index is None:
+        search_index = common.new_search_index(get_setting)
+    return search_index
+
+
+def get_image(url):
+    # local copy of the image if there is one, missing images are downloaded by prefetch_images()
+    global image_cache
+    if image_cache is None and get_image_cache_size() > 0:
+        image_cache = pybongtvapi.ImageCache(max_size=get_image_cache_size())
+    return image_cache.resolve(url) if image_cache is not None else url
+
+
+def prefetch_images():
+    # runs after the listing has been handed to kodi, so the next listing can use local images
+    if image_cache is not None:
+        try:
+            image_cache.prefetch(timeout=IMAGE_PREFETCH_TIMEOUT)
+        finally:
+            image_cache.close()
+
+
+def dump_metrics():
+    # accumulates over all invocations of this addon version in metrics.json, see pybongtvapi.Metrics.dump()
+    if collect_metrics():
+        for line in pybongtvapi.metrics.format():
+            xbmc.log('[{0}] {1}'.format(plugin.id, line), level=xbmc.LOGDEBUG)
+        pybongtvapi.metrics.dump(os.path.join(plugin.storage_path, 'metrics.json'))
+
+
+def close_search_index():
+    if search_index is not None:
+        search_index.close()
+
+
 def new_api():
-    return pybongtvapi.API(credentials=pybongtvapi.UserCredentials(plugin.get_setting('username'),
-                                                                   plugin.get_setting('password')))
+    # one API (and thus one connection pool and session) per invocation
+    global api
+    if api is None:
+        api = common.new_api(get_setting, policy=get_transport_policy(), snapshot=pybongtvapi.GuideSnapshot())
+    return api
 
 
-def new_epg():
-    return pybongtvapi.EPG(new_api())
+def new_epg(search_index=None):
+    return pybongtvapi.EPG(new_api(), search_index=search_index)
 
 
 def new_pvr():
     return pybongtvapi.PVR(new_api())
 
 
+def prefetch_broadcast_details(epg, broadcasts):
+    # epg is either a BongGuide or a Channel
+    if use_extended_broadcast_details():
+        epg.prefetch_broadcast_details(broadcasts, max_workers=get_broadcast_details_workers())
+    return broadcasts
+
+
 def requires_authorization(wrapped):
     def wrapper(*a, **kw):
+        global api
         for _ in range(3):
             try:
                 return wrapped(*a, **kw)
             except pybongtvapi.AuthorizationError:
                 xbmcgui.Dialog().ok(tr(TR_AUTHORIZATION_ERROR), tr(TR_UPDATE_CREDENTIALS))
                 plugin.open_settings()
+                api = None  # the credentials might have changed
+                settings.clear()
 
     return functools.update_wrapper(wrapper, wrapped)
 
 
 @requires_authorization
-def get_recordings():
-    return new_pvr().recordings
+def get_recordings_snapshot():
+    return new_pvr().get_snapshot()
 
 
 @requires_authorization
@@ -212,12 +396,18 @@ def get_channel(channel_id):
     return new_epg().get_channel(channel_id)
 
 
+@requires_authorization
+def get_now_and_next():
+    return new_epg().get_now_and_next()
+
+
 # addon routing
 @plugin.route('/')
 def page_index():
     items = [
         dict(label=tr(TR_BONGSPACE), path=plugin.url_for('page_pvr')),
         dict(label=tr(TR_BONGGUIDE), path=plugin.url_for('page_epg')),
+        dict(label=tr(TR_NOW_AND_NEXT), path=plugin.url_for('page_epg_now')),
         dict(label=tr(TR_SEARCH_BROADCASTS), path=plugin.url_for('page_search')),
     ]
     return finish(items)
@@ -229,11 +419,16 @@ def page_pvr():
         if recorded:
             yield dict(label=tr(TR_X_BROADCASTS_RECORDED, len(recorded)), path=plugin.url_for('page_pvr_recorded'))
         yield dict(label=tr(TR_MANAGE_X_BROADCASTS, len(recordings)), path=plugin.url_for('page_pvr_manage'))
+        yield dict(label=tr(TR_DELETE_SEVERAL_RECORDINGS), path=plugin.url_for('action_delete_recordings'))
+        if recorded:
+            days = get_delete_recordings_older_than_days()
+            yield dict(label=tr(TR_DELETE_RECORDINGS_OLDER_THAN_X_DAYS, days),
+                       path=plugin.url_for('action_delete_old_recordings', days=days))
 
-    recordings = sorted(get_recordings(), key=operator.attrgetter('starts_at'))
-    recorded = [recording for recording in recordings if recording.is_recorded()]
+    snapshot = get_recordings_snapshot()
+    recordings, recorded = snapshot.recordings, snapshot.recorded
     if recordings:
-        return finish(tuple(producer()))
+        return finish(producer())
     else:
         update_view(plugin.url_for('page_index'), msg=tr(TR_NO_RECORDINGS_FOUND))
 
@@ -243,11 +438,13 @@ def page_pvr_recorded():
     def producer():
         for recorded_recording in recorded:
             yield new_recording_item(recorded_recording)
+        if next_page_item is not None:
+            yield next_page_item
 
-    recordings = sorted(get_recordings(), key=operator.attrgetter('starts_at'))
-    recorded = [recording for recording in recordings if recording.is_recorded()]
+    recorded, next_page_item = paginate(get_recordings_snapshot().recorded, 'page_pvr_recorded')
     if recorded:
-        return finish(tuple(producer()), content_type='movies', view_mode_id=504)
+        prefetch_broadcast_details(new_epg(), recorded)
+        return finish(producer(), content_type='movies', view_mode_id=504)
     else:
         update_view(plugin.url_for('page_pvr'), msg=tr(TR_NO_RECORDINGS_FOUND))
 
@@ -259,10 +456,13 @@ def page_pvr_manage():
             path = plugin.url_for('action_delete_recording', recording_id=recording.recording_id,
                                   recording_title=normalize_title(recording, include_time=False))
             yield new_recording_item(recording, path=path, include_channel_name=True)
+        if next_page_item is not None:
+            yield next_page_item
 
-    recordings = sorted(get_recordings(), key=operator.attrgetter('starts_at'))
+    recordings, next_page_item = paginate(get_recordings_snapshot().recordings, 'page_pvr_manage')
     if recordings:
-        return finish(tuple(producer()), content_type='movies', view_mode_id=504)
+        prefetch_broadcast_details(new_epg(), recordings)
+        return finish(producer(), content_type='movies', view_mode_id=504)
     else:
         update_view(plugin.url_for('page_pvr'), msg=tr(TR_NO_RECORDINGS_FOUND))
 
@@ -278,6 +478,29 @@ def action_delete_recording(recording_id, recording_title):
             refresh_view(msg=tr(TR_RECORDING_DELETED, recording_title))
 
 
+def delete_recordings(recordings):
+    if recordings and xbmcgui.Dialog().yesno(tr(TR_TITLE_DELETE_RECORDING), tr(TR_DELETE_X_RECORDINGS,
+                                                                                len(recordings))):
+        results = new_pvr().delete_recordings([recording.recording_id for recording in recordings])
+        deleted = [result for result in results if result.error is None]
+        refresh_view(msg=tr(TR_X_OF_Y_RECORDINGS_DELETED, len(deleted), len(results)))
+
+
+@plugin.route('/action/delete-recordings')
+def action_delete_recordings():
+    recordings = get_recordings_snapshot().recordings
+    selected = multiselect(tr(TR_DELETE_SEVERAL_RECORDINGS), [
+        normalize_title(recording, include_channel_name=True) for recording in recordings])
+    delete_recordings([recordings[i] for i in selected or ()])
+
+
+@plugin.route('/action/delete-old-recordings/<days>')
+def action_delete_old_recordings(days):
+    oldest = time.time() - int(days) * 24 * 3600
+    delete_recordings([recording for recording in get_recordings_snapshot().recorded if
+                       recording.end_timestamp < oldest])
+
+
 @plugin.route('/action/create-recording/<broadcast_id>/<broadcast_title>')
 def action_create_recording(broadcast_id, broadcast_title):
     if xbmcgui.Dialog().yesno(tr(TR_TITLE_RECORD_BROADCAST), tr(TR_RECORD_BROADCAST, broadcast_title)):
@@ -289,59 +512,125 @@ def action_create_recording(broadcast_id, broadcast_title):
         else:
             notify(tr(TR_WILL_RECORD_BROADCAST, broadcast_title))
 
+
+@plugin.route('/action/create-recordings/<channel_id>/<start>')
+def action_create_recordings(channel_id, start):
+    broadcasts = get_slot_broadcasts(get_channel(channel_id), start)
+    selected = multiselect(tr(TR_RECORD_SEVERAL_BROADCASTS), [
+        normalize_title(broadcast) for broadcast in broadcasts])
+    if selected and xbmcgui.Dialog().yesno(tr(TR_TITLE_RECORD_BROADCAST), tr(TR_RECORD_X_BROADCASTS,
+                                                                              len(selected))):
+        results = new_pvr().create_recordings([broadcasts[i].broadcast_id for i in selected])
+        scheduled = [result for result in results if result.error is None]
+        notify(tr(TR_X_OF_Y_BROADCASTS_SCHEDULED, len(scheduled), len(results)))
+
+
 @plugin.route('/epg')
 def page_epg():
     def producer():
-        for channel in get_channels():
+        for channel in channels:
             yield new_channel_item(channel, path=plugin.url_for('page_epg_channel', channel_id=channel.channel_id,
-                                                                offset=0))
-    items = tuple(producer())
-    return finish(items)
+                                                                start=0))
+
+    channels = get_channels()
+    return finish(producer())
 
 
-@plugin.route('/epg/<channel_id>/<offset>')
-def page_epg_channel(channel_id, offset):
+@plugin.route('/epg/now')
+def page_epg_now():
+    def producer():
+        for channel, now, next in now_and_next:
+            path = plugin.url_for('page_epg_channel', channel_id=channel.channel_id, start=0)  # still valid when cached
+            if now is None:
+                item = new_channel_item(channel, path=path)
+            else:
+                item = new_broadcast_item(now, path=path)
+                item.update(label=now.channel_name + ': ' + time.strftime('%H:%M ', now.starts_at) +
+                            normalize_title(now, include_time=False))
+            if next is not None:
+                item.update(label2=tr(TR_NEXT_BROADCAST, time.strftime('%H:%M ', next.starts_at) +
+                                      normalize_title(next, include_time=False)))
+            yield item
+
+    now_and_next = get_now_and_next()
+    prefetch_broadcast_details(new_epg(), [now for _, now, _ in now_and_next if now is not None])
+    return finish(producer(), content_type=VIDEOS)
+
+
+def get_slot_start(start):
+    # start is the start of a time slot or a day offset (0 for the current slot, e.g. in favourites), a slot which is
+    # over already (e.g. of a listing opened a while ago) becomes the current one
+    start, now = int(start), time.time()
+    return max(get_time_slot(now + start * 24 * 3600 if start < 365 else start)[0], get_time_slot(now)[0])
+
+
+def get_slot_broadcasts(channel, start):
+    # the broadcasts of the time slot starting at start, of the current one only those which are not over yet
+    start, end = get_time_slot(get_slot_start(start))
+    start = max(start, int(time.time()))
+    return channel.get_broadcast_window(start, end) if start < end else ()
+
+
+@plugin.route('/epg/<channel_id>/<start>')
+def page_epg_channel(channel_id, start):
     def producer():
-        channel = get_channel(channel_id)
-        broadcasts = channel.get_broadcasts_per_day(offset=int(offset))
         for broadcast in broadcasts:
             path = plugin.url_for('action_create_recording', broadcast_id=broadcast.broadcast_id,
                                   broadcast_title=normalize_title(broadcast, include_time=False))
             yield new_broadcast_item(broadcast, path=path)
         if broadcasts:
-            time.time() + (int(offset) + 1)
-            next_day = time.strftime('%d.%m.', time.localtime(time.time() + ((int(offset) + 1) * 3600 * 24)))
-            next_day_label = tr(TR_NEXT_DAYS_BROADCASTS, next_day)
-            yield dict(label=next_day_label, path=plugin.url_for('page_epg_channel', channel_id=channel_id,
-                                                                 offset=int(offset) + 1))
-        if int(offset) >= 1:
-            time.time() + (int(offset) + 1)
-            previous_day = time.strftime('%d.%m.', time.localtime(time.time() + ((int(offset) - 1) * 3600 * 24)))
-            previous_day_label = tr(TR_PREVIOUS_DAYS_BROADCASTS, previous_day)
-            yield dict(label=previous_day_label, path=plugin.url_for('page_epg_channel', channel_id=channel_id,
-                                                                     offset=int(offset) - 1))
+            yield dict(label=tr(TR_RECORD_SEVERAL_BROADCASTS), path=plugin.url_for(
+                'action_create_recordings', channel_id=channel_id, start=start))
+        yield dict(label=tr(TR_LATER_BROADCASTS, time.strftime('%d.%m. %H:%M', time.localtime(end))),
+                   path=plugin.url_for('page_epg_channel', channel_id=channel_id, start=end))
+        if start > get_time_slot(time.time())[0]:
+            previous_start, _ = get_time_slot(start - 1)
+            yield dict(label=tr(TR_EARLIER_BROADCASTS, time.strftime('%d.%m. %H:%M', time.localtime(previous_start))),
+                       path=plugin.url_for('page_epg_channel', channel_id=channel_id, start=previous_start))
         yield dict(label=tr(TR_LIST_OF_BROADCASTS), path=plugin.url_for('page_epg'))
-    items = tuple(producer())
-    return finish(items, content_type=MOVIES)
+
+    start = get_slot_start(start)
+    _, end = get_time_slot(start)
+    channel = get_channel(channel_id)
+    broadcasts = prefetch_broadcast_details(channel, get_slot_broadcasts(channel, start))
+    return finish(producer(), content_type=MOVIES)
+
 
 @plugin.route('/search')
 def page_search():
     def producer():
-        for broadcast in new_epg().search_broadcasts(search_pattern):
+        for broadcast in prefetch_broadcast_details(epg, broadcasts):
             path = plugin.url_for('action_create_recording', broadcast_id=broadcast.broadcast_id,
                                   broadcast_title=normalize_title(broadcast, include_time=True,
                                                                   include_channel_name=True))
             yield new_broadcast_item(broadcast, path=path, include_time=True, include_channel_name=True)
+        if next_page_item is not None:
+            yield next_page_item
 
-    search_pattern = (plugin.keyboard(heading=tr(TR_TITLE_SEARCH_MATCHING_BROADCASTS)) or '').strip()
+    # the next pages pass the search pattern along instead of asking for it again
+    search_pattern = (plugin.request.args.get('search_pattern', [''])[0] or
+                      plugin.keyboard(heading=tr(TR_TITLE_SEARCH_MATCHING_BROADCASTS)) or '').strip()
     if search_pattern:
-        items = tuple(producer())
-        if items:
-            notify(tr(TR_X_MATCHING_BROADCASTS_FOUND, len(items), search_pattern))
-            return finish(items, content_type='movies', view_mode_id=504)
+        epg = new_epg(search_index=get_search_index())
+        # the local index alone if the background service indexed all channels and days, else merged with bong.tv's
+        # results; start drops the broadcasts which are over from the index's
+        found = epg.search_all_broadcasts(search_pattern, start=time.time())
+        broadcasts, next_page_item = paginate(found, 'page_search', search_pattern=search_pattern)
+        if broadcasts:
+            if 'page' not in plugin.request.args:
+                notify(tr(TR_X_MATCHING_BROADCASTS_FOUND, len(found), search_pattern))
+            return finish(producer(), content_type='movies', view_mode_id=504)
         else:
             refresh_view(msg=tr(TR_NO_MATCHING_BROADCASTS_FOUND, search_pattern))
 
 
 if __name__ == '__main__':
-    plugin.run()
+    try:
+        with timer('route ' + route):
+            plugin.run()
+    except pybongtvapi.UnavailableError:
+        notify(tr(TR_BONGTV_UNAVAILABLE))
+    finally:
+        close_search_index()
+        prefetch_images()
+        dump_metrics()
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+"""
+Just enough of Kodi's xbmc module to run addon.py and service.py outside of Kodi.
+"""
+
+import os
+import tempfile
+
+LOGDEBUG, LOGINFO, LOGNOTICE, LOGWARNING, LOGERROR = 0, 1, 2, 3, 4
+
+PROFILE_DIR = os.environ.get('BENCHMARK_PROFILE_DIR') or tempfile.mkdtemp(prefix='kodi-profile-')
+messages = list()  # everything logged
+builtins = list()  # everything executed by executebuiltin()
+
+
+def log(msg, level=LOGDEBUG):
+    messages.append((level, msg))
+
+
+def executebuiltin(function):
+    builtins.append(function)
+
+
+def translatePath(path):
+    return path.replace('special://profile', PROFILE_DIR).replace('/', os.sep)
+
+
+class Monitor(object):
+    aborted = False
+
+    def abortRequested(self):
+        return self.aborted
+
+    def waitForAbort(self, timeout=None):
+        return self.aborted
+
+
+class Player(object):
+    playing_video = False
+
+    def isPlayingVideo(self):
+        return self.playing_video
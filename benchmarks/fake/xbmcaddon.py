@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+"""
+Just enough of Kodi's xbmcaddon module to run addon.py and service.py outside of Kodi. Settings default to the values
+in resources/settings.xml and can be changed through SETTINGS, strings come from the English strings.xml.
+"""
+
+from xml.etree import ElementTree
+import os
+
+ADDON_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+ADDON_ID = ElementTree.parse(os.path.join(ADDON_DIR, 'addon.xml')).getroot().get('id')
+
+SETTINGS = dict((setting.get('id'), setting.get('default') or '') for setting in ElementTree.parse(
+    os.path.join(ADDON_DIR, 'resources', 'settings.xml')).iter('setting') if setting.get('id'))
+STRINGS = dict((int(string.get('id')), string.text or u'') for string in ElementTree.parse(
+    os.path.join(ADDON_DIR, 'resources', 'language', 'English', 'strings.xml')).iter('string'))
+
+
+class Addon(object):
+
+    def __init__(self, id=None):
+        self.id = id or ADDON_ID
+
+    def getAddonInfo(self, key):
+        return dict(id=self.id, name='BONG.TV', icon=os.path.join(ADDON_DIR, 'icon.png'), path=ADDON_DIR,
+                    profile='special://profile/addon_data/{0}/'.format(self.id), version='benchmark').get(key, '')
+
+    def getSetting(self, setting_id):
+        return SETTINGS.get(setting_id, '')
+
+    def setSetting(self, setting_id, value):
+        SETTINGS[setting_id] = value
+
+    def getLocalizedString(self, string_id):
+        return STRINGS.get(int(string_id), u'')
+
+    def openSettings(self):
+        pass
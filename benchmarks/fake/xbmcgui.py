@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+
+"""
+Just enough of Kodi's xbmcgui module to run addon.py outside of Kodi: every dialog is confirmed, multiselect()
+selects everything.
+"""
+
+
+class Dialog(object):
+
+    def ok(self, heading, line1, line2='', line3=''):
+        return True
+
+    def yesno(self, heading, line1, line2='', line3='', nolabel='', yeslabel=''):
+        return True
+
+    def multiselect(self, heading, options):
+        return list(range(len(options)))
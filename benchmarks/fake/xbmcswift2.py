@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""
+Just enough of xbmcswift2 to run addon.py outside of Kodi. Like in Kodi, the route comes from sys.argv:
+
+    sys.argv = ['plugin://plugin.video.bong_tv/epg/1/0', '1', '?page=1']
+
+Listings handed to Plugin.finish() end up in Plugin.listings, keyboard() returns KEYBOARD_TEXT.
+"""
+
+import re
+import sys
+import urllib
+import urlparse
+import xbmc
+import xbmcaddon
+import xbmcgui
+
+__all__ = ['Plugin', 'xbmc', 'xbmcaddon', 'xbmcgui']
+
+KEYBOARD_TEXT = ''
+
+
+class Request(object):
+
+    def __init__(self, url, handle):
+        self.url = url
+        self.handle = int(handle)
+        url = urlparse.urlsplit(url)
+        self.path = url.path or '/'
+        self.args = urlparse.parse_qs(url.query)
+
+
+class UrlRule(object):
+
+    def __init__(self, url_rule, view_func, name, options):
+        self.url_rule = url_rule
+        self.view_func = view_func
+        self.name = name
+        self.options = options or dict()
+        self.keywords = re.findall(r'<(\w+)>', url_rule)
+        self.regex = re.compile('^' + re.sub(r'<(\w+)>', r'(?P<\1>[^/]+)', url_rule) + '/?$')
+
+    def match(self, path):
+        match = self.regex.match(path)
+        if match is None:
+            return None
+        items = dict(self.options)
+        items.update((key, urllib.unquote_plus(value)) for key, value in match.groupdict().items())
+        return items
+
+    def make_path_qs(self, items):
+        items = dict((key, str(value) if isinstance(value, (int, long)) else value) for key, value in items.items())
+        path = re.sub(r'<(\w+)>', lambda match: urllib.quote_plus(items[match.group(1)]), self.url_rule)
+        query = dict((key, value) for key, value in items.items() if key not in self.keywords)
+        return path + ('?' + urllib.urlencode(query) if query else '')
+
+
+class Plugin(object):
+
+    def __init__(self, name=None, addon_id=None, filepath=None, info_type=None):
+        self.addon = xbmcaddon.Addon(addon_id)
+        self.id = self.addon.getAddonInfo('id')
+        self.name = name or self.addon.getAddonInfo('name')
+        self.storage_path = xbmc.translatePath('special://profile/addon_data/{0}/.storage/'.format(self.id))
+        self.request = None
+        self.listings = list()
+        self.content_type = None
+        self._routes = list()
+
+    def route(self, url_rule, name=None, options=None):
+        def decorator(view_func):
+            self._routes.append(UrlRule(url_rule, view_func, name or view_func.__name__, options))
+            return view_func
+
+        return decorator
+
+    def url_for(self, endpoint, **items):
+        for rule in self._routes:
+            if rule.name == endpoint:
+                return 'plugin://{0}{1}'.format(self.id, rule.make_path_qs(items))
+        raise NotFoundException('no route named "{0}"'.format(endpoint))
+
+    def get_setting(self, key, converter=None):
+        value = self.addon.getSetting(key)
+        if converter is None or converter is str:
+            return value
+        elif converter is unicode:
+            return value.decode('utf-8')
+        elif converter is bool:
+            return value == 'true'
+        elif converter is int:
+            return int(value)
+        raise TypeError('unsupported converter "{0}"'.format(converter))
+
+    def get_string(self, string_id):
+        return self.addon.getLocalizedString(string_id)
+
+    def open_settings(self):
+        self.addon.openSettings()
+
+    def keyboard(self, default=None, heading=None, hidden=False):
+        return KEYBOARD_TEXT or default
+
+    def set_content(self, content_type):
+        self.content_type = content_type
+
+    def finish(self, items=None, sort_methods=None, succeeded=True, update_listing=False, cache_to_disc=True,
+               view_mode=None):
+        # Kodi copies every item into a ListItem, so does this
+        listing = list()
+        for item in items or ():
+            item = dict(item)
+            listing.append((item.pop('path', None), item, not item.pop('is_playable', False)))
+        self.listings.append(listing)
+        return listing
+
+    def run(self):
+        self.request = Request(sys.argv[0] + (sys.argv[2] if len(sys.argv) > 2 else ''),
+                               sys.argv[1] if len(sys.argv) > 1 else -1)
+        for rule in self._routes:
+            items = rule.match(self.request.path)
+            if items is not None:
+                return rule.view_func(**items)
+        raise NotFoundException('no route for "{0}"'.format(self.request.path))
+
+
+class NotFoundException(Exception):
+    pass
@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Offline benchmarks for pybongtvapi, addon.py and service.py against a local bong.tv stub (see stub_server.py).
+
+Every scenario (see scenarios.py) runs in a process of its own, against a fresh stub server and with empty caches,
+and reports wall time, requests and connections to the stub, how far the measured part raised the RSS above where it
+started (peak RSS delta, the scenario's setup does not count) and the number of objects the measured part left behind
+(gc tracked objects, Python 2 has no tracemalloc). The best of --repeat runs counts.
+
+    python benchmarks/run.py --channels 200 --days 14 --latency 0.02 --save baseline.json
+    ... change something ...
+    python benchmarks/run.py --channels 200 --days 14 --latency 0.02 --compare baseline.json
+
+--compare exits with status 1 if a scenario got slower, needs more requests or more memory than in the baseline.
+Baselines are only comparable on the same machine and with the same options.
+"""
+
+from contextlib import contextmanager
+import argparse
+import gc
+import httplib
+import imp
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.abspath(os.path.dirname(__file__))
+ADDON_DIR = os.path.dirname(BENCHMARKS_DIR)
+RESULT_MARKER = 'BENCHMARK RESULT: '
+
+# metric --> (relative tolerance factor, absolute slack), a scenario regresses if one of its metrics exceeds
+# baseline * (1 + factor * tolerance) + slack
+THRESHOLDS = dict(wall_time=(1.0, 0.005), requests=(0.0, 0), peak_rss_delta_kb=(1.0, 1024), objects=(1.0, 200))
+
+
+def read_proc_status_kb(field):
+    # e.g. VmRSS or VmHWM of this process, None where there is no /proc
+    try:
+        with open('/proc/self/status') as status_file:
+            for line in status_file:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except IOError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    # lets VmHWM start over at the current RSS (linux >= 4.0), False if the peak cannot be reset
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs_file:
+            clear_refs_file.write('5')
+    except IOError:
+        return False
+    return read_proc_status_kb('VmHWM') is not None
+
+
+class Bench(object):
+    # what a scenario gets to work with, in the scenario's own process
+
+    def __init__(self, host, workdir, config):
+        self.host = host
+        self.workdir = workdir
+        self.config = config
+        self.days = config['days']
+        self.result = None
+
+    def new_api(self, cache=True, **kwargs):
+        import pybongtvapi
+        return pybongtvapi.API(credentials=pybongtvapi.UserCredentials('benchmark', 'benchmark'),
+                               cache=pybongtvapi.ResponseCache(os.path.join(self.workdir, 'cache')) if cache else None,
+                               **kwargs)
+
+    def new_search_index(self):
+        import pybongtvapi
+        return pybongtvapi.SearchIndex(os.path.join(self.workdir, 'search-index.db'))
+
+    def run_addon(self, path, query='', keyboard_text=''):
+        # like kodi does: a fresh addon.py module for every invocation, the route comes from sys.argv
+        import xbmcswift2
+        xbmcswift2.KEYBOARD_TEXT = keyboard_text
+        sys.argv = ['plugin://plugin.video.bong_tv' + path, '1', query]
+        addon_path = os.path.join(ADDON_DIR, 'addon.py')
+        addon_globals = dict(__name__='__main__', __file__=addon_path)
+        with open(addon_path, mode='rb') as addon_file:
+            code = compile(addon_file.read(), addon_path, 'exec')
+        exec code in addon_globals  # not runpy.run_path(), it replaces sys.argv[0]
+        return addon_globals
+
+    def load_service(self):
+        return imp.load_source('service', os.path.join(ADDON_DIR, 'service.py'))
+
+    def in_child(self, func, *args):
+        # runs func in a forked process, e.g. to generate data without it counting towards this one's peak RSS
+        pid = os.fork()
+        if pid == 0:
+            try:
+                func(*args)
+            finally:
+                os._exit(0)
+        _, status = os.waitpid(pid, 0)
+        if status != 0:
+            raise RuntimeError('{0} failed with status {1}'.format(func.__name__, status))
+
+    def stub_stats(self):
+        connection = httplib.HTTPConnection(self.host)
+        try:
+            connection.request('GET', '/__stats__')
+            return json.loads(connection.getresponse().read())
+        finally:
+            connection.close()
+
+    def inject_fault(self, path, kind, count=None, delay=0):
+        # see stub_server.py, an empty kind removes the faults of path
+        connection = httplib.HTTPConnection(self.host)
+        try:
+            connection.request('POST', '/__faults__', json.dumps(dict(path=path, kind=kind, count=count, delay=delay)))
+            connection.getresponse().read()
+        finally:
+            connection.close()
+
+    @contextmanager
+    def measure(self):
+        gc.collect()
+        stats = self.stub_stats()
+        objects = len(gc.get_objects())
+        if reset_peak_rss():
+            get_peak_rss_kb = lambda: read_proc_status_kb('VmHWM')
+            rss_kb = read_proc_status_kb('VmRSS')
+        else:  # ru_maxrss never goes down, only growth beyond the setup's peak shows
+            get_peak_rss_kb = lambda: resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            rss_kb = get_peak_rss_kb()
+        started = time.time()
+        yield
+        wall_time = time.time() - started
+        peak_rss_kb = get_peak_rss_kb()
+        gc.collect()
+        self.result = dict(wall_time=wall_time, objects=len(gc.get_objects()) - objects,
+                           peak_rss_delta_kb=max(peak_rss_kb - rss_kb, 0),
+                           **dict((name, value - stats[name]) for name, value in self.stub_stats().items()))
+        self.result['connections'] -= 1  # the one for the first stub_stats()
+
+
+def run_child(name, host, workdir, config):
+    sys.path[:0] = [os.path.join(BENCHMARKS_DIR, 'fake'), os.path.join(ADDON_DIR, 'resources', 'lib')]
+    import pybongtvapi
+    import xbmcaddon
+    pybongtvapi.HOST = host
+    pybongtvapi.DEFAULT_COOKIE_DIR = os.path.join(workdir, 'cookies')
+    xbmcaddon.SETTINGS.update(username='benchmark', password='benchmark', prewarm_request_delay='0')
+    import scenarios
+    bench = Bench(host, workdir, config)
+    scenarios.SCENARIOS[name](bench)
+    if bench.result is None:
+        raise RuntimeError('scenario "{0}" did not measure anything'.format(name))
+    sys.stdout.write(RESULT_MARKER + json.dumps(bench.result) + '\n')
+
+
+def run_scenario(name, config):
+    sys.path.insert(0, BENCHMARKS_DIR)
+    from stub_server import StubServer
+    server = StubServer(('127.0.0.1', 0), channels=config['channels'], recordings=config['recordings'],
+                        search_results=config['search_results'], latency=config['latency'], gzip=config['gzip'],
+                        fixtures=config['fixtures']).start()
+    workdir = tempfile.mkdtemp(prefix='pybongtvapi-benchmark-')
+    try:
+        env = dict(os.environ, BENCHMARK_PROFILE_DIR=os.path.join(workdir, 'profile'))
+        output = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--child', name,
+                                          '--host', server.host, '--workdir', workdir,
+                                          '--config', json.dumps(config)], env=env)
+        for line in output.splitlines():
+            if line.startswith(RESULT_MARKER):
+                return json.loads(line[len(RESULT_MARKER):])
+        raise RuntimeError('scenario "{0}" did not report a result'.format(name))
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def best_of(results):
+    return dict((metric, min(result[metric] for result in results)) for metric in results[0])
+
+
+def regressions(result, baseline, tolerance):
+    for metric, (factor, slack) in sorted(THRESHOLDS.items()):
+        if metric in baseline and result[metric] > baseline[metric] * (1 + factor * tolerance) + slack:
+            yield metric
+
+
+def format_result(name, result, baseline=None):
+    line = '{0:<30} {1:>9.1f}ms {2:>6} req {3:>5} conn {4:>8.1f}MB {5:>8} obj'.format(
+        name, 1000 * result['wall_time'], result['requests'], result['connections'],
+        result['peak_rss_delta_kb'] / 1024.0, result['objects'])
+    if baseline:
+        line += ' {0:>+7.1%} time'.format(result['wall_time'] / max(baseline['wall_time'], 1e-6) - 1)
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('scenarios', nargs='*', help='names or name prefixes, default: all')
+    parser.add_argument('--list', action='store_true', help='list the scenarios')
+    parser.add_argument('--channels', type=int, default=50)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--recordings', type=int, default=200)
+    parser.add_argument('--search-results', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds the stub adds to every request')
+    parser.add_argument('--no-gzip', dest='gzip', action='store_false')
+    parser.add_argument('--fixtures', help='directory with recorded payloads, see stub_server.py')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', metavar='FILE', help='save the results as a baseline')
+    parser.add_argument('--compare', metavar='FILE', help='fail on regressions against a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='relative slack for --compare')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--host', help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    parser.add_argument('--config', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return run_child(args.child, args.host, args.workdir, json.loads(args.config))
+
+    sys.path[:0] = [os.path.join(BENCHMARKS_DIR, 'fake'), os.path.join(ADDON_DIR, 'resources', 'lib')]
+    import scenarios
+    names = [name for name in scenarios.SCENARIOS if not args.scenarios or
+             any(name.startswith(prefix) for prefix in args.scenarios)]
+    if args.list:
+        print '\n'.join(names)
+        return 0
+
+    config = dict(channels=args.channels, days=args.days, recordings=args.recordings,
+                  search_results=args.search_results, latency=args.latency, gzip=args.gzip,
+                  fixtures=os.path.abspath(args.fixtures) if args.fixtures else None)
+    baseline = None
+    if args.compare:
+        with open(args.compare, mode='rb') as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline['config'] != config:
+            print 'warning: the baseline was measured with {0}'.format(baseline['config'])
+
+    results = dict()
+    failed = list()
+    for name in names:
+        results[name] = best_of([run_scenario(name, config) for _ in range(max(args.repeat, 1))])
+        previous = (baseline or dict()).get('results', dict()).get(name)
+        print format_result(name, results[name], previous)
+        if previous:
+            for metric in regressions(results[name], previous, args.tolerance):
+                failed.append(name)
+                print '  REGRESSION {0}: {1} --> {2}'.format(metric, previous[metric], results[name][metric])
+
+    if args.save:
+        with open(args.save, mode='wb') as baseline_file:
+            json.dump(dict(config=config, results=results), baseline_file, indent=2, sort_keys=True)
+    if failed:
+        print '{0} of {1} scenarios regressed'.format(len(set(failed)), len(names))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
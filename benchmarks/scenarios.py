@@ -0,0 +1,477 @@
+# -*- coding: utf-8 -*-
+
+"""
+The benchmark scenarios run by run.py. A scenario gets a Bench, does its setup and wraps the part to be measured in
+"with bench.measure():". Every scenario runs in a process of its own against a fresh stub server and empty caches.
+"""
+
+import collections
+import itertools
+import json
+import os
+import pybongtvapi
+import stub_server
+import time
+
+SCENARIOS = collections.OrderedDict()
+SEARCH_PATTERN = 'Titel'
+
+
+def scenario(func):
+    SCENARIOS[func.__name__] = func
+    return func
+
+
+def expect(condition, message, *args):
+    # scenarios which check behaviour, not just speed, fail the run this way
+    if not condition:
+        raise AssertionError(message.format(*args))
+
+
+def warm_up_guide(bench):
+    # fetches and indexes all channels and days once, like the background service does
+    api = bench.new_api()
+    guide = pybongtvapi.BongGuide(api)
+    channel_ids = [channel.channel_id for channel in guide.get_channels()]
+    guide.get_broadcast_grid(channel_ids, range(bench.days), upcoming_only=False)
+    search_index = bench.new_search_index()
+    for channel_id in channel_ids:
+        for offset in range(bench.days):
+            date = pybongtvapi.get_date(offset)
+            search_index.add_day(channel_id, date, api.get_broadcasts(channel_id, date))
+    search_index.close()
+    api.close()
+    return channel_ids
+
+
+# pybongtvapi
+@scenario
+def guide_channels(bench):
+    guide = pybongtvapi.BongGuide(bench.new_api())
+    with bench.measure():
+        guide.get_channels()
+
+
+@scenario
+def guide_grid_cold(bench):
+    guide = pybongtvapi.BongGuide(bench.new_api())
+    channel_ids = [channel.channel_id for channel in guide.get_channels()]
+    with bench.measure():
+        guide.get_broadcast_grid(channel_ids, range(bench.days), upcoming_only=False)
+
+
+@scenario
+def guide_grid_warm(bench):
+    channel_ids = warm_up_guide(bench)
+    guide = pybongtvapi.BongGuide(bench.new_api())
+    with bench.measure():
+        guide.get_broadcast_grid(channel_ids, range(bench.days), upcoming_only=False)
+
+
+@scenario
+def guide_now_and_next(bench):
+    guide = pybongtvapi.BongGuide(bench.new_api())
+    with bench.measure():
+        guide.get_now_and_next()
+
+
+@scenario
+def guide_window(bench):
+    guide = pybongtvapi.BongGuide(bench.new_api())
+    guide.get_channels()
+    start = time.time()
+    end = start + 3 * 3600
+    with bench.measure():
+        grid = guide.get_broadcast_window(start, end)
+    expect(not grid.errors, '{0} channels failed', len(grid.errors))
+    expect(all(broadcasts and broadcasts[0].start_timestamp <= start < broadcasts[0].end_timestamp for broadcasts in
+               grid.broadcasts.values()), 'the broadcasts running at the start of the window are missing')
+    expect(bench.result['requests'] <= len(grid.broadcasts) * len(pybongtvapi.get_dates(start, end)),
+           '{0} requests, more than the days the window touches', bench.result['requests'])
+
+
+@scenario
+def guide_broadcast_details(bench):
+    guide = pybongtvapi.BongGuide(bench.new_api())
+    broadcasts = guide.get_channels()[0].get_broadcasts_per_day(upcoming_only=False)
+    with bench.measure():
+        guide.prefetch_broadcast_details(broadcasts)
+        [broadcast.plot for broadcast in broadcasts]
+
+
+def lookup_broadcast_details(bench, max_connections):
+    api = bench.new_api(cache=False, connection_pool=pybongtvapi.ConnectionPool(max_connections=max_connections))
+    api.cookie  # logs in
+    with bench.measure():
+        for broadcast_id in range(100000, 100200):
+            api.get_broadcast_details(broadcast_id)
+    expect(bench.result['requests'] == 200, '{0} requests instead of 200', bench.result['requests'])
+
+
+@scenario
+def details_pooled(bench):
+    lookup_broadcast_details(bench, pybongtvapi.DEFAULT_MAX_CONNECTIONS)
+    expect(bench.result['connections'] <= 1, '{0} connections for 200 lookups', bench.result['connections'])
+
+
+@scenario
+def details_unpooled(bench):
+    lookup_broadcast_details(bench, 0)
+
+
+@scenario
+def guide_search_remote(bench):
+    guide = pybongtvapi.BongGuide(bench.new_api())
+    with bench.measure():
+        [broadcast.title for broadcast in guide.iter_search_broadcasts(SEARCH_PATTERN)]
+
+
+@scenario
+def guide_search_local(bench):
+    warm_up_guide(bench)
+    guide = pybongtvapi.BongGuide(bench.new_api(), search_index=bench.new_search_index())
+    with bench.measure():
+        found = guide.search_local_broadcasts(SEARCH_PATTERN + ' folge')
+        [broadcast.title for broadcast in found[:50]]  # the first page, like the addon
+    expect(len(found) > 50, 'only {0} broadcasts found', len(found))
+
+
+@scenario
+def space_snapshot(bench):
+    space = pybongtvapi.BongSpace(bench.new_api())
+    with bench.measure():
+        snapshot = space.get_snapshot()
+        [(recording.title, recording.url) for recording in snapshot.recorded]
+
+
+@scenario
+def space_conditional_requests(bench):
+    pybongtvapi.RECORDINGS_TTL = 0  # every call revalidates, in the foreground
+    api = bench.new_api(stale_while_revalidate=False)
+    api.list_user_recordings()
+    size = api.cache.get_entry(pybongtvapi.ResponseCache.make_key('/api/v1/recordings.json'))['size']
+    with bench.measure():
+        for _ in range(3):
+            api.list_user_recordings()
+            list(api.iter_user_recordings())
+    expect(size > 0, 'no wire size stored for the recordings')
+    expect(api.conditional_stats == dict(requests=6, not_modified=6, bytes_saved=6 * size),
+           '{0} instead of 6 304s saving {1} bytes', api.conditional_stats, 6 * size)
+
+
+@scenario
+def space_delete_bulk(bench):
+    space = pybongtvapi.BongSpace(bench.new_api())
+    recording_ids = [recording.recording_id for recording in space.get_snapshot()][:50]
+    with bench.measure():
+        space.delete_recordings(recording_ids)
+
+
+@scenario
+def async_grid_cold(bench):
+    guide = pybongtvapi.AsyncBongGuide(bench.new_api())
+    channel_ids = [channel.channel_id for channel in guide.get_channels().result()]
+    with bench.measure():
+        grid = guide.get_broadcast_grid(channel_ids, range(bench.days), upcoming_only=False).result()
+    expected = pybongtvapi.BongGuide(bench.new_api()).get_broadcast_grid(channel_ids, range(bench.days),
+                                                                         upcoming_only=False)
+    expect(not grid.errors, '{0} cells failed', len(grid.errors))
+    expect(dict((cell, [b.broadcast_id for b in broadcasts]) for cell, broadcasts in grid.broadcasts.items()) ==
+           dict((cell, [b.broadcast_id for b in broadcasts]) for cell, broadcasts in expected.broadcasts.items()),
+           'the async grid differs from the blocking one')
+
+
+@scenario
+def async_broadcast_details(bench):
+    guide = pybongtvapi.AsyncBongGuide(bench.new_api())
+    broadcasts = guide.get_broadcasts_per_day(1, upcoming_only=False).result()
+    with bench.measure():
+        failed = guide.prefetch_broadcast_details(broadcasts, limit=8).result()
+    expect(not failed and all(broadcast.has_broadcast_details() for broadcast in broadcasts),
+           '{0} broadcasts without details', len(failed))
+
+
+@scenario
+def async_space_bulk(bench):
+    space = pybongtvapi.AsyncBongSpace(bench.new_api())
+    recording_ids = [recording.recording_id for recording in space.get_snapshot().result()][:50]
+    with bench.measure():
+        created, deleted = pybongtvapi.gather([space.create_recordings(range(1000, 1050)),
+                                               space.delete_recordings(recording_ids)])
+    expect(not any(result.error for result in created + deleted), 'bulk operations failed')
+    snapshot = space.get_snapshot().result()
+    expect(not set(recording_ids) & set(snapshot.by_id), 'deleted recordings are still in the snapshot')
+    expect(set(result.result.recording_id for result in created) <= set(snapshot.by_id),
+           'created recordings are missing in the snapshot')
+
+
+@scenario
+def async_api(bench):
+    # AsyncAPI on its own: every day of every channel as one batch of Futures, uncached like the first click
+    api = pybongtvapi.AsyncAPI(bench.new_api(cache=False))
+    channel_ids = [data['id'] for data in api.list_channels().result()]
+    cells = [(channel_id, pybongtvapi.get_date(offset)) for channel_id in channel_ids for offset in range(bench.days)]
+    with bench.measure():
+        days = pybongtvapi.gather([api.get_broadcasts(channel_id, date) for channel_id, date in cells])
+    expected = bench.new_api(cache=False)
+    expect(all(day == expected.get_broadcasts(channel_id, date) for (channel_id, date), day in zip(cells, days)),
+           'the async broadcasts differ from the blocking ones')
+
+
+def make_guide(bench):
+    # (channel_id, date, broadcasts) of every channel and day, decoded from JSON like API.get_broadcasts() does
+    now = int(time.time())
+    return [(channel_id, pybongtvapi.get_date(offset), json.loads(json.dumps([
+        stub_server.broadcast(channel_id * 100000 + offset * 100 + i, channel_id, now + offset * 86400 + i * 1800)
+        for i in range(stub_server.BROADCASTS_PER_DAY)])))
+        for channel_id in range(1, bench.config['channels'] + 1) for offset in range(bench.days)]
+
+
+@scenario
+def models_guide(bench):
+    # the Broadcast objects of a whole guide (--days x --channels), all kept
+    days = make_guide(bench)
+    api = bench.new_api()
+    with bench.measure():
+        broadcasts = [[pybongtvapi.Broadcast(data, api) for data in day] for _, _, day in days]
+    expect(sum(len(day) for day in broadcasts) == len(days) * stub_server.BROADCASTS_PER_DAY,
+           'broadcasts are missing')
+
+
+@scenario
+def models_html_unescape(bench):
+    # every text field of a whole guide, with named and numeric entities and the repetitions of a real EPG
+    strings = [field for _, _, day in make_guide(bench) for data in day for field in itertools.chain(
+        (data['title'], data['subtitle'], data['short_text'], data['channel_name'], data['country']),
+        (category['name'] for category in data['categories']))]
+    pybongtvapi._unescaped.clear()
+    with bench.measure():
+        unescaped = [pybongtvapi.html_unescape(s) for s in strings]
+    expect(len(unescaped) == len(strings), 'strings are missing')
+    expect(pybongtvapi.html_unescape(u'Titel &amp; Folge &#228; &#xE4; &auml; &bogus;') ==
+           'Titel & Folge \xc3\xa4 \xc3\xa4 \xc3\xa4 &bogus;', 'entities are not unescaped correctly')
+
+
+# a whole guide in one file, loaded from scratch to show one channel's day like an addon invocation does
+def write_guide_files(bench):
+    days = make_guide(bench)
+    with open(os.path.join(bench.workdir, 'guide.json'), mode='wb') as guide_file:
+        json.dump(dict(('{0} {1}'.format(channel_id, date), broadcasts) for channel_id, date, broadcasts in days),
+                  guide_file)
+    pybongtvapi.GuideSnapshot.write(days, path=os.path.join(bench.workdir, 'guide.snapshot'))
+
+
+@scenario
+def guide_file_json(bench):
+    bench.in_child(write_guide_files, bench)
+    api = bench.new_api()
+    with bench.measure():
+        with open(os.path.join(bench.workdir, 'guide.json'), mode='rb') as guide_file:
+            days = json.load(guide_file)
+        [pybongtvapi.Broadcast(data, api).title for data in days['1 ' + pybongtvapi.get_date(bench.days - 1)]]
+
+
+@scenario
+def guide_file_snapshot(bench):
+    bench.in_child(write_guide_files, bench)
+    api = bench.new_api()
+    with bench.measure():
+        snapshot = pybongtvapi.GuideSnapshot(os.path.join(bench.workdir, 'guide.snapshot'))
+        [pybongtvapi.Broadcast(data, api).title for data in snapshot.get_broadcasts(1, pybongtvapi.get_date(
+            bench.days - 1))]
+
+
+# addon.py, every invocation starts with fresh module globals like in kodi
+@scenario
+def addon_index(bench):
+    with bench.measure():
+        bench.run_addon('/')
+
+
+@scenario
+def addon_epg(bench):
+    with bench.measure():
+        bench.run_addon('/epg')
+
+
+@scenario
+def addon_epg_now(bench):
+    with bench.measure():
+        bench.run_addon('/epg/now')
+
+
+@scenario
+def addon_epg_channel_cold(bench):
+    with bench.measure():
+        bench.run_addon('/epg/1/0')
+
+
+@scenario
+def addon_epg_channel_warm(bench):
+    bench.run_addon('/epg/1/0')
+    with bench.measure():
+        bench.run_addon('/epg/1/0')
+
+
+@scenario
+def addon_epg_channel_snapshot(bench):
+    service = bench.load_service()
+    service.prewarm(service.xbmc.Monitor(), service.xbmc.Player())
+    bench.run_addon('/epg/1/0')
+    pybongtvapi.TODAYS_BROADCASTS_TTL = 0  # the snapshot is good until the next one is due, whatever the TTL
+    pybongtvapi.metrics.reset()
+    with bench.measure():
+        listing = bench.run_addon('/epg/1/0')['plugin'].listings[-1]
+    expect(listing, 'the snapshot has no broadcasts of channel 1')
+    expect(pybongtvapi.metrics.counters['snapshot_hit GET /api/v1/broadcasts.json'], 'the snapshot was not used')
+
+
+@scenario
+def addon_pvr_recorded(bench):
+    with bench.measure():
+        bench.run_addon('/pvr/recorded')
+
+
+@scenario
+def addon_pvr_recorded_prewarmed(bench):
+    pybongtvapi.RECORDINGS_TTL = 0  # expired by the time the addon is opened, as they usually are
+    service = bench.load_service()
+    service.prewarm(service.xbmc.Monitor(), service.xbmc.Player())
+    pybongtvapi.metrics.reset()
+    with bench.measure():
+        bench.run_addon('/pvr/recorded')
+    expect(pybongtvapi.metrics.counters['cache_stale GET /api/v1/recordings.json'] == 1,
+           'the pre-warmed recordings were not served while being revalidated')
+
+
+@scenario
+def addon_pvr_manage_next_page(bench):
+    bench.run_addon('/pvr/manage')
+    with bench.measure():
+        bench.run_addon('/pvr/manage', '?page=1')
+
+
+@scenario
+def addon_search(bench):
+    with bench.measure():
+        bench.run_addon('/search', keyboard_text=SEARCH_PATTERN)
+
+
+@scenario
+def addon_search_merged(bench):
+    service = bench.load_service()
+    service.prewarm(service.xbmc.Monitor(), service.xbmc.Player())  # indexes the first prewarm_days days only
+    pybongtvapi.metrics.reset()
+    with bench.measure():
+        bench.run_addon('/search', keyboard_text=SEARCH_PATTERN)
+        listing = bench.run_addon('/search', '?search_pattern={0}&page=2'.format(SEARCH_PATTERN))['plugin'].listings[-1]
+    expect(listing, 'no third page, the index\'s broadcasts are missing')
+    counters = pybongtvapi.metrics.counters
+    expect(counters['cache_miss GET /api/v1/broadcasts/search.json'] == 1 and
+           not counters['cache_hit GET /api/v1/broadcasts/search.json'], 'the next page searched again')
+
+
+# service.py
+@scenario
+def service_prewarm(bench):
+    service = bench.load_service()
+    with bench.measure():
+        service.prewarm(service.xbmc.Monitor(), service.xbmc.Player())
+
+
+@scenario
+def service_prewarm_images_full(bench):
+    service = bench.load_service()
+    service.addon.setSetting('image_cache_size', '8')  # MB
+    image_cache = pybongtvapi.ImageCache()
+    os.makedirs(image_cache.cache_dir)
+    for i in range(int(8 * 1024 * pybongtvapi.CACHE_LOW_WATER_MARK / 64) + 1):  # the addon's images, 64 KB each
+        with open(os.path.join(image_cache.cache_dir, '{0}.png'.format(i)), mode='wb') as image_file:
+            image_file.write('\0' * 64 * 1024)
+    images = set(os.listdir(image_cache.cache_dir))
+    with bench.measure():
+        service.prewarm(service.xbmc.Monitor(), service.xbmc.Player())
+    expect(set(os.listdir(image_cache.cache_dir)) == images, 'the full image cache changed')
+
+
+# faults, these fail the run if the transport policy does not hold
+@scenario
+def fault_retry_5xx(bench):
+    api = bench.new_api()
+    api.cookie  # logs in
+    guide = pybongtvapi.BongGuide(api)
+    bench.inject_fault('/api/v1/channels.json', 'error', count=2)
+    with bench.measure():
+        channels = guide.get_channels()
+    expect(channels, 'no channels after two 503')
+    expect(bench.result['requests'] == 3, '{0} requests instead of 3', bench.result['requests'])
+
+
+@scenario
+def fault_hanging_budget(bench):
+    api = bench.new_api(policy=pybongtvapi.DEFAULT_TRANSPORT_POLICY._replace(timeout=1, budget=2))
+    guide = pybongtvapi.BongGuide(api)
+    channel_ids = [channel.channel_id for channel in guide.get_channels()]
+    bench.inject_fault('/api/v1/broadcasts.json', 'hang', delay=5)
+    with bench.measure():
+        grid = guide.get_broadcast_grid(channel_ids[:10], range(2), upcoming_only=False)
+    expect(len(grid.errors) == 20, '{0} of 20 cells failed', len(grid.errors))
+    expect(all(isinstance(error, pybongtvapi.UnavailableError) for error in grid.errors.values()),
+           'unexpected errors: {0}', set(grid.errors.values()))
+    expect(bench.result['wall_time'] < 3, 'the grid took {0:.1f}s with a budget of 2s', bench.result['wall_time'])
+
+
+@scenario
+def fault_no_resend(bench):
+    policy = pybongtvapi.DEFAULT_TRANSPORT_POLICY._replace(timeout=1)
+    api = bench.new_api(cache=False, policy=policy)
+    api.list_channels()  # logs in, leaves a kept-alive connection in the pool
+    bench.inject_fault('/api/v1/recordings.json', 'hang', count=1, delay=3)
+    bench.inject_fault('/api/v1/channels.json', 'reset', count=1)
+    error = None
+    with bench.measure():
+        expect(api.list_channels(), 'no channels after a reset of the kept-alive connection')
+        try:
+            api.create_recording(1)
+        except pybongtvapi.UnavailableError as error:
+            pass
+    expect(error is not None, 'a hanging POST did not time out')
+    expect(bench.result['requests'] == 3, '{0} requests instead of 3, a timed out POST was sent again',
+           bench.result['requests'])
+    expect(bench.result['wall_time'] < 2, 'took {0:.1f}s with a timeout of 1s', bench.result['wall_time'])
+
+
+@scenario
+def fault_circuit_breaker_cache(bench):
+    pybongtvapi.CHANNELS_TTL = pybongtvapi.TODAYS_BROADCASTS_TTL = pybongtvapi.UPCOMING_BROADCASTS_TTL = 0
+    channel_ids = warm_up_guide(bench)  # everything in the cache, but expired
+    policy = pybongtvapi.DEFAULT_TRANSPORT_POLICY._replace(backoff=0.01)
+    guide = pybongtvapi.BongGuide(bench.new_api(stale_while_revalidate=False, policy=policy))
+    bench.inject_fault('/api/v1/', 'error')
+    pybongtvapi.metrics.reset()
+    with bench.measure():
+        grid = guide.get_broadcast_grid(channel_ids, range(bench.days), upcoming_only=False)
+    expect(not grid.errors, '{0} cells failed instead of served from the cache', len(grid.errors))
+    # the channel list's attempts, then the broadcasts' until the circuit opens; every other worker may have passed
+    # allow() right before the last of those failures
+    max_requests = 1 + policy.retries + policy.failure_threshold + pybongtvapi.DEFAULT_MAX_WORKERS - 1
+    expect(bench.result['requests'] <= max_requests, '{0} requests, the circuit breaker did not open',
+           bench.result['requests'])
+    counters = pybongtvapi.metrics.snapshot()['counters']
+    expect(any(name.startswith('circuit_open') for name in counters), 'the circuit breaker did not open')
+
+
+@scenario
+def fault_circuit_breaker_clicks(bench):
+    import xbmcaddon
+    xbmcaddon.SETTINGS.update(request_retries='0', failure_threshold='3')
+    bench.inject_fault('/api/v1/channels.json', 'error')
+    for _ in range(3):  # one failure per click
+        try:
+            bench.run_addon('/epg')
+        except pybongtvapi.ServerError:
+            pass
+    with bench.measure():
+        bench.run_addon('/epg')
+    expect(bench.result['requests'] == 0, '{0} requests, the circuit breaker forgot the earlier clicks',
+           bench.result['requests'])
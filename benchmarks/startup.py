@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Cold start times of addon.py: like in Kodi, every invocation is a fresh interpreter, here with the fake xbmc*
+modules (see fake/) and against a local bong.tv stub (see stub_server.py). Reports the time from the first line of
+the bootstrap to the end of the route, the number of modules imported and whether pybongtvapi was imported.
+
+    python benchmarks/startup.py --repeat 20 / /epg /epg/1/0
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+BENCHMARKS_DIR = os.path.abspath(os.path.dirname(__file__))
+ADDON_DIR = os.path.dirname(BENCHMARKS_DIR)
+RESULT_MARKER = 'STARTUP RESULT: '
+
+# runs in the fresh interpreter: pybongtvapi must not be imported up front, so it is pointed at the stub on import
+BOOTSTRAP = '''
+import time
+started = time.time()
+import __builtin__, json, os, sys
+host, cookie_dir, addon_path, path, query = sys.argv[1:]
+sys.path.insert(0, {fake_dir!r})
+_import = __builtin__.__import__
+
+def configuring_import(name, *args, **kwargs):
+    module = _import(name, *args, **kwargs)
+    if name == 'pybongtvapi' and getattr(module, 'HOST', None) != host:
+        module.HOST = host
+        module.DEFAULT_COOKIE_DIR = cookie_dir
+    return module
+
+__builtin__.__import__ = configuring_import
+import xbmcaddon
+xbmcaddon.SETTINGS.update(username='benchmark', password='benchmark')
+sys.argv = ['plugin://plugin.video.bong_tv' + path, '1', query]
+with open(addon_path, mode='rb') as addon_file:
+    code = compile(addon_file.read(), addon_path, 'exec')
+exec code in dict(__name__='__main__', __file__=addon_path)
+sys.stdout.write({marker!r} + json.dumps(dict(wall_time=time.time() - started, modules=len(sys.modules),
+                                              pybongtvapi='pybongtvapi' in sys.modules)) + '\\n')
+'''
+
+
+def run_once(host, workdir, path, query=''):
+    bootstrap = BOOTSTRAP.format(fake_dir=os.path.join(BENCHMARKS_DIR, 'fake'), marker=RESULT_MARKER)
+    env = dict(os.environ, BENCHMARK_PROFILE_DIR=os.path.join(workdir, 'profile'))
+    output = subprocess.check_output([sys.executable, '-c', bootstrap, host, os.path.join(workdir, 'cookies'),
+                                      os.path.join(ADDON_DIR, 'addon.py'), path, query], env=env)
+    for line in output.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    raise RuntimeError('"{0}" did not report a result'.format(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('paths', nargs='*', default=['/', '/epg', '/epg/1/0', '/pvr/recorded'])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--channels', type=int, default=50)
+    args = parser.parse_args()
+
+    sys.path.insert(0, BENCHMARKS_DIR)
+    from stub_server import StubServer
+    server = StubServer(('127.0.0.1', 0), channels=args.channels).start()
+    workdir = tempfile.mkdtemp(prefix='pybongtvapi-startup-')
+    try:
+        for path in args.paths:
+            run_once(server.host, workdir, path)  # the caches are warm, like for a page seen before
+            results = sorted((run_once(server.host, workdir, path) for _ in range(max(args.repeat, 1))),
+                             key=lambda result: result['wall_time'])
+            print '{0:<30} {1:>8.1f}ms min {2:>8.1f}ms median {3:>5} modules{4}'.format(
+                path, 1000 * results[0]['wall_time'], 1000 * results[len(results) // 2]['wall_time'],
+                results[0]['modules'], '' if results[0]['pybongtvapi'] else ', no pybongtvapi')
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+A local stand-in for bong.tv's /api/v1 endpoints, serving synthetic (or recorded) payloads with configurable latency,
+gzip and size. GET /__stats__ returns the number of requests and connections served so far.
+
+Recorded payloads are looked up as <fixtures>/<url path>, e.g. fixtures/api/v1/channels.json, and served for every
+request of that path regardless of the query string. Everything else is generated.
+
+Faults are injected per path prefix, on the command line or by POSTing {"path": ..., "kind": ..., ...} to /__faults__:
+"error" answers with 503, "hang" waits for delay seconds before answering, "reset" drops the connection. A fault
+applies to the next count requests (all if count is null), an empty kind removes the faults of the path.
+
+    python benchmarks/stub_server.py --port 8080 --channels 200 --latency 0.05 --fault /api/v1/broadcasts.json=error
+"""
+
+from cStringIO import StringIO
+import argparse
+import BaseHTTPServer
+import gzip
+import hashlib
+import json
+import os
+import re
+import socket
+import SocketServer
+import sys
+import threading
+import time
+import urlparse
+
+BROADCASTS_PER_DAY = 48
+CATEGORIES = ('Krimi', 'Serie', 'Spielfilm', 'Dokumentation', 'Nachrichten', 'Sport', 'Kinder', 'Komödie')
+
+
+def broadcast(broadcast_id, channel_id, start, duration=1800):
+    return dict(id=broadcast_id, title=u'Titel &amp; Folge {0}'.format(broadcast_id % 997),
+                subtitle=u'Untertitel &auml; {0}'.format(broadcast_id % 89), production_year=1950 + broadcast_id % 70,
+                starts_at_ms=start, ends_at_ms=start + duration, country='D', hd=channel_id % 3 == 0,
+                image=dict(href='/images/broadcast/{0}.jpg'.format(broadcast_id)), channel_id=channel_id,
+                channel_name=u'Sender {0}'.format(channel_id),
+                serie=dict(season=1 + broadcast_id % 7, episode=1 + broadcast_id % 23, total_episodes=23),
+                categories=[dict(name=CATEGORIES[broadcast_id % len(CATEGORIES)]),
+                            dict(name=CATEGORIES[(broadcast_id // 8) % len(CATEGORIES)])],
+                short_text=u'Kurzbeschreibung &#228; ' + u'Lorem ipsum dolor sit amet. ' * (1 + broadcast_id % 5))
+
+
+def broadcast_details(broadcast_id):
+    details = broadcast(broadcast_id, 1 + broadcast_id // 100000, int(time.time()))
+    details.update(long_text=u'Langtext &amp; mehr. ' * 40, hint_text=u'Tipp', rating=broadcast_id % 5, votes=42,
+                   roles=[dict(name='Regisseur', people=[dict(name='Regie Person')]),
+                          dict(name='Schauspieler', people=[dict(name='Darsteller {0}'.format(i), role='Rolle')
+                                                            for i in range(5)])])
+    return details
+
+
+class StubServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, channels=50, recordings=200, search_results=100, latency=0.0, gzip=True,
+                 fixtures=None):
+        BaseHTTPServer.HTTPServer.__init__(self, address, Handler)
+        self.channels = channels
+        self.recordings = recordings
+        self.search_results = search_results
+        self.latency = latency
+        self.gzip = gzip
+        self.fixtures = fixtures
+        self.stats = dict(requests=0, connections=0)
+        self.lock = threading.Lock()
+        self.deleted = set()
+        self.faults = dict()  # path prefix --> dict(kind, count, delay)
+        self.next_recording_id = recordings
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def inject_fault(self, path, kind, count=None, delay=0):
+        with self.lock:
+            if kind:
+                self.faults[path] = dict(kind=kind, count=count, delay=delay)
+            else:
+                self.faults.pop(path, None)
+
+    def take_fault(self, path):
+        with self.lock:
+            for prefix, fault in self.faults.items():
+                if path.startswith(prefix):
+                    if fault['count'] is not None:
+                        fault['count'] -= 1
+                        if fault['count'] <= 0:
+                            del self.faults[prefix]
+                    return fault
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], socket.error):  # clients giving up on a hanging fault
+            BaseHTTPServer.HTTPServer.handle_error(self, request, client_address)
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    @property
+    def host(self):
+        return '{0}:{1}'.format(*self.server_address)
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # or delayed ACKs add 40ms to every keep-alive request
+
+    def log_message(self, *a):
+        pass
+
+    def setup(self):
+        self.server.count('connections')
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+
+    def _reply(self, body, status=200, content_type='application/json', headers=None):
+        if not isinstance(body, str):
+            body = json.dumps(body)
+        headers = dict(headers or dict())
+        if content_type == 'application/json':
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            if self.headers.get('if-none-match') == etag:
+                status, body = 304, ''
+            headers['ETag'] = etag
+        if body and self.server.gzip and 'gzip' in (self.headers.get('accept-encoding') or ''):
+            compressed = StringIO()
+            with gzip.GzipFile(fileobj=compressed, mode='wb') as f:
+                f.write(body)
+            body = compressed.getvalue()
+            headers['Content-Encoding'] = 'gzip'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _fixture(self, path):
+        if self.server.fixtures:
+            fixture_path = os.path.join(self.server.fixtures, path.lstrip('/'))
+            if os.path.isfile(fixture_path):
+                with open(fixture_path, mode='rb') as fixture_file:
+                    return fixture_file.read()
+
+    def _recordings(self):
+        now = int(time.time())
+        return [dict(id=i, status='recorded' if i % 3 else 'scheduled', quality='HD',
+                     broadcast=broadcast(900000 + i, 1 + i % self.server.channels, now + (i % 60 - 40) * 86400),
+                     files=[dict(quality='hd', href='http://{0}/files/{1}.mp4'.format(self.server.host, i))])
+                for i in range(self.server.recordings) if i not in self.server.deleted]
+
+    def _begin(self):
+        # returns the path and query, or None if a fault took care of the request
+        url = urlparse.urlsplit(self.path)
+        if not url.path.startswith('/__'):
+            self.server.count('requests')
+            if self.server.latency:
+                time.sleep(self.server.latency)
+            fault = self.server.take_fault(url.path)
+            if fault is not None:
+                if fault['kind'] == 'reset':
+                    self.close_connection = 1
+                    return None
+                time.sleep(fault['delay'])
+                if fault['kind'] == 'error':
+                    self._reply(dict(error='injected'), status=503)
+                    return None
+        return url.path, dict(urlparse.parse_qsl(url.query))
+
+    def do_GET(self):
+        request = self._begin()
+        if request is None:
+            return
+        path, query = request
+        if path == '/__stats__':
+            return self._reply(json.dumps(self.server.stats), content_type='text/plain')
+        fixture = self._fixture(path)
+        if fixture is not None:
+            return self._reply(fixture)
+        if path == '/api/v1/channels.json':
+            return self._reply(dict(channels=[dict(id=i, name=u'Sender {0}'.format(i), recordable=i % 10 != 0,
+                                                   position=i, hd=i % 3 == 0)
+                                              for i in range(1, self.server.channels + 1)]))
+        if path == '/api/v1/broadcasts.json':
+            channel_id = int(query['channel_id'])
+            day, month, year = [int(part) for part in query['date'].split('-')]
+            midnight = int(time.mktime((year, month, day, 0, 0, 0, 0, 0, -1)))
+            first_id = channel_id * 100000 + (midnight // 86400 % 1000) * BROADCASTS_PER_DAY
+            return self._reply(dict(broadcasts=[
+                broadcast(first_id + i, channel_id, midnight + i * (86400 // BROADCASTS_PER_DAY),
+                          86400 // BROADCASTS_PER_DAY) for i in range(BROADCASTS_PER_DAY)]))
+        if path == '/api/v1/broadcasts/search.json':
+            now = int(time.time())
+            return self._reply(dict(broadcasts=[broadcast(800000 + i, 1 + i % self.server.channels, now + i * 900)
+                                                for i in range(self.server.search_results)]))
+        match = re.match(r'^/api/v1/broadcasts/([0-9]+)\.json$', path)
+        if match:
+            return self._reply(dict(broadcast=broadcast_details(int(match.group(1)))))
+        if path == '/api/v1/recordings.json':
+            return self._reply(dict(recordings=self._recordings()))
+        if path.startswith('/images/'):
+            return self._reply('\x89PNG\r\n\x1a\n' + hashlib.sha1(path).digest() * 256, content_type='image/png')
+        self._reply(dict(), status=404)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('content-length') or 0))
+        request = self._begin()
+        if request is None:
+            return
+        path, _ = request
+        if path == '/__faults__':
+            self.server.inject_fault(**json.loads(body))
+            return self._reply(json.dumps(self.server.faults), content_type='text/plain')
+        params = dict(urlparse.parse_qsl(body))
+        if path == '/api/v1/user_sessions.json':
+            return self._reply(dict(), headers={'Set-Cookie': 'session=stub; path=/'})
+        if path == '/api/v1/recordings.json':
+            with self.server.lock:
+                recording_id = self.server.next_recording_id
+                self.server.next_recording_id += 1
+            return self._reply(dict(recording=dict(id=recording_id, status='scheduled', quality='HD', files=[],
+                                                   broadcast=broadcast(int(params.get('broadcast_id') or 0), 1,
+                                                                       int(time.time()) + 3600))))
+        self._reply(dict(), status=404)
+
+    def do_DELETE(self):
+        request = self._begin()
+        if request is None:
+            return
+        path, _ = request
+        match = re.match(r'^/api/v1/recordings/([0-9]+)\.json$', path)
+        if match:
+            self.server.deleted.add(int(match.group(1)))
+            return self._reply(dict())
+        self._reply(dict(), status=404)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--channels', type=int, default=50)
+    parser.add_argument('--recordings', type=int, default=200)
+    parser.add_argument('--search-results', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every request')
+    parser.add_argument('--no-gzip', dest='gzip', action='store_false')
+    parser.add_argument('--fixtures', help='directory with recorded payloads')
+    parser.add_argument('--fault', action='append', default=list(), metavar='PATH=KIND[:DELAY]',
+                        help='inject a fault into all requests of PATH (prefix)')
+    args = parser.parse_args()
+    server = StubServer(('127.0.0.1', args.port), channels=args.channels, recordings=args.recordings,
+                        search_results=args.search_results, latency=args.latency, gzip=args.gzip,
+                        fixtures=args.fixtures)
+    for fault in args.fault:
+        path, kind = fault.split('=', 1)
+        kind, _, delay = kind.partition(':')
+        server.inject_fault(path, kind, delay=float(delay or 0))
+    print 'serving on http://{0}'.format(server.host)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015 Christian Maugg
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+
+What addon.py and service.py share: where pybongtvapi keeps its files and how API and SearchIndex are set up from the
+addon's settings. Both pass their own get_setting(setting_id, converter), the addon's asks kodi once per invocation.
+"""
+
+import os
+import pybongtvapi
+
+circuit_breaker_dir = None
+
+
+def configure(storage_path):
+    # storage_path: xbmcswift2's plugin.storage_path of the addon
+    global circuit_breaker_dir
+    circuit_breaker_dir = os.path.join(storage_path, 'circuits')  # the addon's API lasts for one click only
+    pybongtvapi.DEFAULT_COOKIE_DIR = os.path.join(storage_path, '..', '.pybongtvapi', 'cookies')
+    pybongtvapi.DEFAULT_CACHE_DIR = os.path.join(storage_path, 'cache')
+    pybongtvapi.DEFAULT_IMAGE_CACHE_DIR = os.path.join(storage_path, 'images')
+    pybongtvapi.DEFAULT_SEARCH_INDEX_PATH = os.path.join(storage_path, 'search-index.db')
+    pybongtvapi.DEFAULT_GUIDE_SNAPSHOT_PATH = os.path.join(storage_path, 'guide.snapshot')
+
+
+def get_transport_policy(get_setting, budget=None):
+    # budget: seconds all requests of one API may take together, None for no limit
+    return pybongtvapi.DEFAULT_TRANSPORT_POLICY._replace(
+        timeout=get_setting('request_timeout', converter=int),
+        budget=budget,
+        retries=get_setting('request_retries', converter=int),
+        failure_threshold=get_setting('failure_threshold', converter=int))
+
+
+def new_api(get_setting, **kwargs):
+    # kwargs go to API(), e.g. policy or snapshot
+    cache_size = get_setting('cache_size', converter=int) * 1024 * 1024
+    return pybongtvapi.API(credentials=pybongtvapi.UserCredentials(get_setting('username'), get_setting('password')),
+                           cache=pybongtvapi.ResponseCache(max_size=cache_size) if cache_size > 0 else None,
+                           circuit_breaker_dir=circuit_breaker_dir, **kwargs)
+
+
+def new_search_index(get_setting):
+    return pybongtvapi.SearchIndex() if get_setting('use_local_search', converter=bool) else None
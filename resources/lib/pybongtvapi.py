@@ -29,6 +29,38 @@ SOFTWARE.
 CHANGELOG
 =========
 
+0.3
+===
+* API keeps keep-alive connections to bong.tv in a ConnectionPool instead of connecting for every request
+* BongGuide/Channel.prefetch_broadcast_details() fetches broadcast details concurrently
+* optional on-disk ResponseCache for channels and daily broadcasts (per-endpoint TTLs, stale-while-revalidate, LRU)
+* BongGuide.get_channel() and BongSpace.get_recording() look up an index by id instead of scanning all items
+* BongGuide.get_broadcast_grid() fetches a channel x day grid of broadcasts concurrently
+* BongGuide.get_now_and_next() looks up current and next broadcasts of all channels in a BroadcastTimeIndex
+* optional SearchIndex: local prefix and accent-insensitive search in a sqlite database, updated a day at a time
+* Broadcast, Recording and Channel use __slots__, keep the raw JSON data and decode fields on first access only
+* html_unescape() handles numeric entities, skips strings without "&" and memoizes recurring strings
+* recordings and search results can be streamed: incremental gzip decompression and JSON array decoding
+* API shares one Session per user and process, which persists the cookie atomically and logs in again on 401
+* conditional requests (ETag/If-Modified-Since) for cached responses and the recordings list, 304 serves the cache
+* BongSpace.get_snapshot(): RecordingsSnapshot with precomputed views, updated in place by create/delete_recording
+* BongSpace.create_recordings()/delete_recordings() run bulk operations concurrently
+* API(stale_while_revalidate=False) refreshes stale cache entries in the foreground, e.g. for pre-warming
+* ImageCache keeps channel logos and thumbnails on disk (LRU) and downloads missing ones concurrently
+* search results are cached for SEARCH_TTL, so they can be paged through
+* Metrics: per-endpoint request counters, latency histograms, wire/decoded bytes, cache hits and decoding times
+* bugfix: a full ResponseCache/ImageCache listed its whole directory again on every set()
+* API(policy=TransportPolicy(...)): request timeouts within a time budget, retries with backoff for GET requests and
+  a circuit breaker per endpoint (its state kept in API(circuit_breaker_dir=...) if given); cached responses are
+  served while bong.tv is unavailable
+* AsyncAPI, AsyncBongGuide and AsyncBongSpace return Futures running on a shared EventLoop; EventLoop.map() fans out
+  with a concurrency limit, Future.then() and gather() compose the results
+* GuideSnapshot: the broadcasts of many channels and days in a compact binary file (columns, interned strings) which
+  is memory mapped, API(snapshot=...) reads a channel's day from it instead of parsing JSON until the day expires
+* cheaper import: no regular expressions compiled and no gzip, email.utils or htmlentitydefs imported up front
+* Channel.get_broadcast_window()/BongGuide.get_broadcast_window(): the broadcasts running at some point of a [start,
+  end) time window, including the one which started before, from the fewest days possible merged in order
+
 0.2
 ===
 * bugfix: Recording.is_scheduled() did'nt work
@@ -39,28 +71,69 @@ CHANGELOG
 
 """
 
-from contextlib import closing
-from cStringIO import StringIO
+from contextlib import closing, contextmanager
+import atexit
+import bisect
 import collections
-import gzip
-import htmlentitydefs
+import copy
+import datetime
+import errno
+import hashlib
+import heapq
 import httplib
 import itertools
 import json
+import mmap
 import operator
 import os
+import Queue
+import random
 import re
+import socket
+import struct
+import threading
 import time
+import unicodedata
 import urllib
+import urlparse
 import zlib
 
 __author__ = 'Christian Maugg <software@christian.maugg.de>'
-__version__ = version = '0.2'
+__version__ = version = '0.3'
 
 USER_AGENT = 'pybongtvapi/' + version
 HOST = 'bong.tv'
 DEFAULT_COOKIE_DIR = os.path.join(os.path.expanduser('~'), '.pybongtvapi')
-NAME2CODEPOINT_REGEX = re.compile('&(' + '|'.join(htmlentitydefs.name2codepoint) + ');')
+DEFAULT_SESSION_LIFETIME = 24 * 3600  # if bong.tv does not tell when a session expires
+DEFAULT_MAX_CONNECTIONS = 4
+DEFAULT_MAX_IDLE_TIME = 30  # seconds
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_CHUNK_SIZE = 16 * 1024
+DEFAULT_TIMEOUT = 10  # seconds per request
+DEFAULT_RETRIES = 2  # for GET requests failing with a connection error, a timeout or a 5xx status
+DEFAULT_BACKOFF = 0.25  # seconds before the first retry, doubled for every further one
+DEFAULT_MAX_BACKOFF = 4
+DEFAULT_FAILURE_THRESHOLD = 5  # consecutive failures which open an endpoint's circuit, 0 --> never
+DEFAULT_RESET_TIMEOUT = 30  # seconds until an open circuit lets a probe request through
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.pybongtvapi', 'cache')
+DEFAULT_CACHE_SIZE = 16 * 1024 * 1024  # bytes
+CACHE_LOW_WATER_MARK = 0.9  # eviction shrinks a full cache to this share of its size
+DEFAULT_MAX_STALENESS = 24 * 3600  # stale cache entries older than this are not served anymore
+CHANNELS_TTL = 24 * 3600
+TODAYS_BROADCASTS_TTL = 15 * 60
+UPCOMING_BROADCASTS_TTL = 6 * 3600
+RECORDINGS_TTL = 60  # long enough to move between the PVR pages without fetching the recordings again
+SEARCH_TTL = 10 * 60  # long enough to page through the results of a search
+DEFAULT_IMAGE_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.pybongtvapi', 'images')
+DEFAULT_IMAGE_CACHE_SIZE = 64 * 1024 * 1024  # bytes
+IMAGE_TOUCH_INTERVAL = 3600  # LRU resolution of the ImageCache, saves a write for every image shown
+DEFAULT_SEARCH_INDEX_PATH = os.path.join(os.path.expanduser('~'), '.pybongtvapi', 'search-index.db')
+DEFAULT_SEARCH_INDEX_RETENTION = 24 * 3600  # broadcasts which ended longer ago are dropped from the index
+DEFAULT_GUIDE_SNAPSHOT_PATH = os.path.join(os.path.expanduser('~'), '.pybongtvapi', 'guide.snapshot')
+# patterns, not compiled regular expressions: re compiles (and caches) them on first use, not on import
+WORD_PATTERN = r'(?u)\w+'
+ENTITY_PATTERN = r'&(#[0-9]+|#[xX][0-9a-fA-F]+|[A-Za-z][A-Za-z0-9]*);'
+UNESCAPE_CACHE_SIZE = 4096  # channel names, categories, recurring titles ...
 
 
 class Error(Exception):
@@ -91,19 +164,365 @@ class UnprocessableEntityError(ClientError):
     pass
 
 
+class UnavailableError(ServerError):
+    # bong.tv did not answer (in time) or the endpoint's circuit is open
+    pass
+
+
 RecordingError = UnprocessableEntityError
 UserCredentials = collections.namedtuple('UserCredentials', 'username password')
 Actor = collections.namedtuple('Actor', 'name role')
+BroadcastGrid = collections.namedtuple('BroadcastGrid', 'broadcasts errors')
+NowAndNext = collections.namedtuple('NowAndNext', 'channel now next')
+BulkResult = collections.namedtuple('BulkResult', 'item_id result error')
+# budget: seconds all requests of an API may take together, None --> no limit
+TransportPolicy = collections.namedtuple('TransportPolicy', 'timeout budget retries backoff max_backoff '
+                                                            'failure_threshold reset_timeout')
+DEFAULT_TRANSPORT_POLICY = TransportPolicy(timeout=DEFAULT_TIMEOUT, budget=None, retries=DEFAULT_RETRIES,
+                                           backoff=DEFAULT_BACKOFF, max_backoff=DEFAULT_MAX_BACKOFF,
+                                           failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                                           reset_timeout=DEFAULT_RESET_TIMEOUT)
+
+
+def _unescape_entity(match):
+    name = match.group(1)
+    try:
+        if name[0] != '#':
+            import htmlentitydefs  # on first use only
+            return unichr(htmlentitydefs.name2codepoint[name])
+        elif name[1] in 'xX':
+            return unichr(int(name[2:], 16))
+        else:
+            return unichr(int(name[1:]))
+    except (KeyError, ValueError, OverflowError):  # unknown entity or codepoint --> keep it as it is
+        return match.group(0)
+
+
+_unescaped = dict()
 
 
 def html_unescape(s):
-    unescaped = ''
-    if s:
-        unescaped = re.sub(NAME2CODEPOINT_REGEX, lambda m: unichr(htmlentitydefs.name2codepoint[m.group(1)]), s)
-    return unescaped.encode('utf-8') if type(unescaped) is unicode else unescaped
+    if not s:
+        return ''
+    try:
+        return _unescaped[s]
+    except KeyError:
+        pass
+    unescaped = s
+    if '&' in s:
+        unescaped = re.sub(ENTITY_PATTERN, _unescape_entity, s.decode('utf-8', 'replace') if type(s) is str else s)
+    unescaped = unescaped.encode('utf-8') if type(unescaped) is unicode else unescaped
+    if len(_unescaped) >= UNESCAPE_CACHE_SIZE:
+        _unescaped.clear()
+    _unescaped[s] = unescaped
+    return unescaped
+
+
+def split_search_terms(s):
+    # lower case words without accents, so that "Mädchen" is found by "madchen" and "MÄDCHEN"
+    if type(s) is not unicode:
+        s = (s or '').decode('utf-8', 'replace')
+    s = unicodedata.normalize('NFKD', s.lower().replace(u'\xdf', u'ss'))
+    return re.findall(WORD_PATTERN, u''.join(c for c in s if not unicodedata.combining(c)))
+
+
+def get_date(offset=0):
+    # the date offset days from today as API.get_broadcasts() expects it
+    return time.strftime('%d-%m-%Y', time.localtime(time.time() + (int(offset) * 3600 * 24)))
+
+
+def get_dates(start, end):
+    # the dates of the (local) days the time window [start, end) touches, like get_date()
+    day, last_day = datetime.date.fromtimestamp(start), datetime.date.fromtimestamp(max(end - 1, start))
+    dates = list()
+    while day <= last_day:
+        dates.append(day.strftime('%d-%m-%Y'))
+        day += datetime.timedelta(days=1)
+    return dates
+
+
+def write_file_atomically(path, data):
+    # readers see either the old or the new file, never a half-written one
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    temp_path = path + '.' + str(threading.current_thread().ident) + '.tmp'
+    with open(temp_path, mode='wb') as temp_file:
+        temp_file.write(data)
+    try:
+        os.rename(temp_path, path)
+    except OSError:  # windows does not replace existing files
+        os.remove(path)
+        os.rename(temp_path, path)
+
+
+def run_concurrently(func, items, max_workers=DEFAULT_MAX_WORKERS):
+    # calls func(item) for every item on up to max_workers threads, returns (result, error) tuples in order of items
+    items = tuple(items)
+    results = [None] * len(items)
+    pending = Queue.Queue()
+    for index, item in enumerate(items):
+        pending.put((index, item))
+
+    def worker():
+        while True:
+            try:
+                index, item = pending.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                results[index] = (func(item), None)
+            except Exception as error:
+                results[index] = (None, error)
+
+    workers = [threading.Thread(target=worker) for _ in range(min(max(int(max_workers), 1), len(items)))]
+    for thread in workers:
+        thread.daemon = True
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return results
+
+
+def prefetch_broadcast_details(api, broadcasts, max_workers=DEFAULT_MAX_WORKERS, timeout=None):
+    # fetches the details of all broadcasts which do not have them yet, failed lookups are left for lazy loading
+    broadcasts = [broadcast for broadcast in broadcasts if not broadcast.has_broadcast_details()]
+    results = run_concurrently(lambda broadcast: api.get_broadcast_details(broadcast.broadcast_id, timeout=timeout),
+                               broadcasts, max_workers=max_workers)
+    return assign_broadcast_details(broadcasts, results)
+
+
+def assign_broadcast_details(broadcasts, results):
+    # results: (broadcast_details, error) per broadcast, returns the broadcasts whose lookup failed
+    failed = list()
+    for broadcast, (broadcast_details, error) in zip(broadcasts, results):
+        if error is None:
+            broadcast._broadcast_details_data = broadcast_details
+        else:
+            failed.append(broadcast)
+    return tuple(failed)
+
+
+def make_broadcast_grid(cells, results):
+    # cells: (channel, offset) pairs, results: (broadcasts, error) per cell
+    grid = BroadcastGrid(dict(), dict())
+    for (channel, offset), (broadcasts, error) in zip(cells, results):
+        if error is None:
+            grid.broadcasts[(channel.channel_id, offset)] = broadcasts
+        else:
+            grid.errors[(channel.channel_id, offset)] = error
+    return grid
+
+
+def merge_broadcasts(days, start, end):
+    # the broadcasts of days (each sorted by start time) running at some point of [start, end), merged in order of
+    # their start times; a broadcast listed on two days (around midnight) is kept once
+    merged = list()
+    for _, broadcast_id, broadcast in heapq.merge(*[
+            [(broadcast.start_timestamp, broadcast.broadcast_id, broadcast) for broadcast in day if
+             broadcast.start_timestamp < end and broadcast.end_timestamp > start] for day in days]):
+        if not merged or merged[-1].broadcast_id != broadcast_id:
+            merged.append(broadcast)
+    return tuple(merged)
+
+
+def get_broadcast_window(channels, start, end, max_workers=DEFAULT_MAX_WORKERS, timeout=None):
+    # BroadcastGrid mapping channel_id to the broadcasts running at some point of [start, end). Fetches the days the
+    # window touches (from the cache or snapshot if they are there), the day before only for channels where none of
+    # those starts by start: a broadcast running over midnight is listed on the day it starts
+    days = collections.defaultdict(list)
+    grid = BroadcastGrid(dict(), dict())
+
+    def fetch(cells):
+        results = run_concurrently(lambda (channel, date): channel.get_broadcasts_per_date(date, timeout=timeout),
+                                   cells, max_workers=max_workers)
+        for (channel, date), (broadcasts, error) in zip(cells, results):
+            if error is None:
+                days[channel.channel_id].append(broadcasts)
+            elif date != previous_date:  # without the day before, only the broadcast running at start is missing
+                grid.errors[channel.channel_id] = error
+
+    previous_date = (datetime.date.fromtimestamp(start) - datetime.timedelta(days=1)).strftime('%d-%m-%Y')
+    fetch([(channel, date) for channel in channels for date in get_dates(start, end)])
+    fetch([(channel, previous_date) for channel in channels if channel.channel_id not in grid.errors and not any(
+        broadcasts and broadcasts[0].start_timestamp <= start for broadcasts in days[channel.channel_id])])
+    for channel in channels:
+        if channel.channel_id not in grid.errors:
+            grid.broadcasts[channel.channel_id] = merge_broadcasts(days[channel.channel_id], start, end)
+    return grid
+
+
+class Future(object):
+    # the result of a call running on an EventLoop, set exactly once
+
+    def __init__(self):
+        super(Future, self).__init__()
+        self._done = threading.Event()
+        self._result = None
+        self._error = None
+        self._callbacks = list()
+        self._lock = threading.Lock()
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise UnavailableError('no result after {0}s'.format(timeout))
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def exception(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise UnavailableError('no result after {0}s'.format(timeout))
+        return self._error
+
+    def _set(self, result, error):
+        with self._lock:
+            if self._done.is_set():
+                return
+            self._result, self._error = result, error
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, None
+        for callback in callbacks:
+            callback(self)
+
+    def set_result(self, result):
+        self._set(result, None)
+
+    def set_exception(self, error):
+        self._set(None, error)
+
+    def add_done_callback(self, callback):
+        # callback(future) runs in the thread which completes the future, or right away if it is done already
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def then(self, func):
+        # a Future of func(result), or of func(result).result() if func returns a Future itself. Errors propagate.
+        future = Future()
+
+        def chain(done):
+            if done._error is not None:
+                return future.set_exception(done._error)
+            try:
+                result = func(done._result)
+            except Exception as error:
+                return future.set_exception(error)
+            if isinstance(result, Future):
+                result.add_done_callback(lambda inner: future._set(inner._result, inner._error))
+            else:
+                future.set_result(result)
+
+        self.add_done_callback(chain)
+        return future
+
+
+class EventLoop(object):
+    # a fixed set of worker threads running blocking calls, shared by all Async* objects (see get_event_loop()).
+    # Python 2 has no asyncio: calls return Futures, which are composed with Future.then() and gather().
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        super(EventLoop, self).__init__()
+        self.max_workers = max(int(max_workers), 1)
+        self._pending = Queue.Queue()
+        self._workers = list()
+        self._lock = threading.Lock()
+
+    def _work(self):
+        while True:
+            task = self._pending.get()
+            if task is None:
+                return
+            future, func, args, kwargs = task
+            try:
+                result = func(*args, **kwargs)
+            except Exception as error:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def submit(self, func, *args, **kwargs):
+        with self._lock:
+            if len(self._workers) < self.max_workers:  # workers are started on demand
+                thread = threading.Thread(target=self._work)
+                thread.daemon = True
+                thread.start()
+                self._workers.append(thread)
+        future = Future()
+        self._pending.put((future, func, args, kwargs))
+        return future
+
+    def map(self, func, items, limit=None):
+        # a Future of (result, error) tuples in order of items, like run_concurrently(). At most limit calls are
+        # submitted at a time, every finished one submits the next.
+        items = tuple(items)
+        results = [None] * len(items)
+        future = Future()
+        state = dict(submitted=0, finished=0)
+        lock = threading.Lock()
+
+        def submit_next():
+            with lock:
+                index = state['submitted']
+                if index >= len(items):
+                    return
+                state['submitted'] += 1
+            self.submit(run, index)
+
+        def run(index):
+            try:
+                results[index] = (func(items[index]), None)
+            except Exception as error:
+                results[index] = (None, error)
+            with lock:
+                state['finished'] += 1
+                finished = state['finished'] == len(items)
+            if finished:
+                future.set_result(results)
+            else:
+                submit_next()
 
+        if not items:
+            future.set_result(results)
+        for _ in range(min(max(int(limit or len(items)), 1), len(items))):
+            submit_next()
+        return future
 
-def http_request(method, url_path, cookie=None, params=None, headers=None, timeout=None):
+    def close(self):
+        # lets the workers finish what has been submitted so far and waits for them to stop
+        with self._lock:
+            workers, self._workers = self._workers, list()
+            for _ in workers:
+                self._pending.put(None)
+        for thread in workers:
+            if thread is not threading.current_thread():
+                thread.join()
+
+
+_event_loop = None
+_event_loop_lock = threading.Lock()
+
+
+def get_event_loop():
+    # the process wide EventLoop
+    global _event_loop
+    with _event_loop_lock:
+        if _event_loop is None:
+            _event_loop = EventLoop()
+            atexit.register(_event_loop.close)  # idle daemon threads break the interpreter's shutdown
+        return _event_loop
+
+
+def gather(futures, timeout=None):
+    # waits for all futures and returns their results in order, raises the first error
+    return [future.result(timeout=timeout) for future in futures]
+
+
+def _prepare_request(method, url_path, cookie=None, params=None, headers=None):
 
     # normalize everything
     method = method.upper()
@@ -126,22 +545,897 @@ def http_request(method, url_path, cookie=None, params=None, headers=None, timeo
         pass  # CHECK nothing to do here?
     else:
         raise ValueError('unsupported HTTP method: "{0}"'.format(method))
+    return method, url_path, body, headers
+
+
+def http_request(method, url_path, cookie=None, params=None, headers=None, timeout=None, connection_pool=None):
+    endpoint = Metrics.endpoint(method.upper(), url_path)
+    method, url_path, body, headers = _prepare_request(method, url_path, cookie=cookie, params=params,
+                                                       headers=headers)
+    started = time.time()
+    if connection_pool is None:
+        with closing(httplib.HTTPConnection(HOST, timeout=timeout)) as connection:
+            connection.request(method, url_path, body, headers)
+            response = connection.getresponse()
+            result = response.read() or ''
+    else:
+        response, result = connection_pool.request(method, url_path, body, headers, timeout=timeout)
+    metrics.record('http ' + endpoint, time.time() - started)
+    metrics.count('bytes_wire ' + endpoint, len(result))
+    headers = dict((k.lower(), v) for k, v in response.getheaders())
+    if result[:2] == b'\037\213':  # probe for gzip header
+        with metrics.timer('gunzip ' + endpoint):
+            result = zlib.decompress(result, 16 + zlib.MAX_WBITS)  # no gzip module, it is slower and costs an import
+    metrics.count('bytes_decoded ' + endpoint, len(result))
+    return response.status, result, headers
+
+
+def http_stream(method, url_path, cookie=None, params=None, headers=None, timeout=None, connection_pool=None,
+                chunk_size=DEFAULT_CHUNK_SIZE):
+    # like http_request, but returns a generator of (decompressed) body chunks instead of the whole body
+    endpoint = Metrics.endpoint(method.upper(), url_path)
+    method, url_path, body, headers = _prepare_request(method, url_path, cookie=cookie, params=params,
+                                                       headers=headers)
+    started = time.time()
+    connection_pool = connection_pool or ConnectionPool(max_connections=0)
+    connection, response = connection_pool.open(method, url_path, body, headers, timeout=timeout)
+
+    def producer():
+        decompressor = None
+        completed = False
+        wire_size = decoded_size = 0
+        gunzip_time = 0.0
+        try:
+            while True:
+                chunk = response.read(chunk_size)
+                if not chunk:
+                    break
+                wire_size += len(chunk)
+                if decompressor is None:
+                    # probe for gzip header, 16 + MAX_WBITS --> zlib expects a gzip header and trailer
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if chunk[:2] == b'\037\213' else False
+                if decompressor:
+                    decompress_started = time.time()
+                    chunk = decompressor.decompress(chunk)
+                    gunzip_time += time.time() - decompress_started
+                decoded_size += len(chunk)
+                yield chunk
+            if decompressor:
+                chunk = decompressor.flush()
+                decoded_size += len(chunk)
+                yield chunk
+            completed = True
+        finally:
+            # the time until the body has been read includes the consumer's time, e.g. for decoding JSON
+            metrics.record('http ' + endpoint, time.time() - started)
+            metrics.count('bytes_wire ' + endpoint, wire_size)
+            metrics.count('bytes_decoded ' + endpoint, decoded_size)
+            if decompressor:
+                metrics.record('gunzip ' + endpoint, gunzip_time)
+            if completed:
+                connection_pool.release(connection, response)
+            else:  # abandoned or failed half way --> the connection cannot be reused
+                connection.close()
+
+    headers = dict((k.lower(), v) for k, v in response.getheaders())
+    return response.status, producer(), headers
+
+
+def iter_json_array(chunks, key):
+    # yields the items of the JSON array at key of a JSON object as soon as they are complete
+    decoder = json.JSONDecoder()
+    chunks = iter(chunks)
+    marker = '"' + key + '"'
+    buf, pos, in_array = '', 0, False
+    while True:
+        if not in_array:
+            i = buf.find(marker)
+            if i >= 0:
+                j = buf.find('[', i + len(marker))
+                if j >= 0:
+                    buf, pos, in_array = buf[j + 1:], 0, True
+                    continue
+            else:
+                buf = buf[-len(marker):]  # the marker might be split across chunks
+        else:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buf):
+                if buf[pos] == ']':
+                    for _ in chunks:
+                        pass  # read up to the end, so that the connection can be reused
+                    return
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                except ValueError:
+                    pass  # incomplete item --> read on
+                else:
+                    if end < len(buf) or isinstance(item, (dict, list)):
+                        yield item
+                        pos = end
+                        continue
+            buf, pos = buf[pos:], 0
+        chunk = next(chunks, None)
+        if chunk is None:
+            if in_array:
+                raise Error('truncated JSON array "{0}"'.format(key))
+            return  # no such array
+        buf += chunk
+
+
+class Metrics(object):
+    # counters and latency histograms, see the module wide instance "metrics". Names are "<what> <endpoint>", e.g.
+    # "http GET /api/v1/broadcasts/{id}.json" or "cache_hit GET /api/v1/channels.json"
+
+    LATENCY_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10)  # upper bounds, seconds
+
+    def __init__(self):
+        super(Metrics, self).__init__()
+        self._lock = threading.Lock()
+        self.counters = collections.Counter()
+        self.timings = dict()
 
-    with closing(httplib.HTTPConnection(HOST, timeout=timeout)) as connection:
+    @staticmethod
+    def endpoint(method, url_path):
+        # ids and the query string would make every request an endpoint of its own
+        return method + ' ' + re.sub(r'/[0-9]+', '/{id}', url_path.split('?', 1)[0])
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def record(self, name, seconds, count=1):
+        with self._lock:
+            timing = self.timings.get(name)
+            if timing is None:
+                timing = self.timings[name] = dict(count=0, total=0.0, max=0.0,
+                                                   histogram=[0] * (len(self.LATENCY_BUCKETS) + 1))
+            timing['count'] += count
+            timing['total'] += seconds
+            timing['max'] = max(timing['max'], seconds)
+            timing['histogram'][bisect.bisect_left(self.LATENCY_BUCKETS, seconds)] += count
+
+    @contextmanager
+    def timer(self, name):
+        started = time.time()
+        try:
+            yield
+        finally:
+            self.record(name, time.time() - started)
+
+    def reset(self):
+        with self._lock:
+            self.counters = collections.Counter()
+            self.timings = dict()
+
+    def snapshot(self):
+        with self._lock:
+            return dict(version=version, buckets=self.LATENCY_BUCKETS, counters=dict(self.counters),
+                        timings=copy.deepcopy(self.timings))
+
+    def merge(self, snapshot):
+        # adds the counters and timings of a snapshot(), e.g. one read back from a dump()
+        with self._lock:
+            self.counters.update(snapshot.get('counters') or dict())
+            for name, other in (snapshot.get('timings') or dict()).items():
+                timing = self.timings.setdefault(name, dict(count=0, total=0.0, max=0.0,
+                                                            histogram=[0] * (len(self.LATENCY_BUCKETS) + 1)))
+                timing['count'] += other['count']
+                timing['total'] += other['total']
+                timing['max'] = max(timing['max'], other['max'])
+                timing['histogram'] = [a + b for a, b in zip(timing['histogram'], other['histogram'])]
+
+    def dump(self, path, accumulate=True):
+        # writes a JSON snapshot to path, adding up with the one already there if it is of the same version
+        snapshot = self.snapshot()
+        if accumulate:
+            try:
+                with open(path, mode='rb') as metrics_file:
+                    previous = json.load(metrics_file)
+            except (IOError, OSError, ValueError):
+                previous = None
+            if previous and previous.get('version') == version:
+                accumulated = Metrics()
+                accumulated.merge(previous)
+                accumulated.merge(snapshot)
+                snapshot = accumulated.snapshot()
+        write_file_atomically(path, json.dumps(snapshot, indent=2, sort_keys=True))
+
+    def format(self):
+        # one line per counter and timing, e.g. for logging
+        with self._lock:
+            lines = ['{0}: {1}'.format(name, value) for name, value in sorted(self.counters.items())]
+            lines.extend('{0}: n={1} avg={2:.1f}ms max={3:.1f}ms'.format(
+                name, timing['count'], 1000.0 * timing['total'] / max(timing['count'], 1), 1000.0 * timing['max'])
+                for name, timing in sorted(self.timings.items()))
+        return lines
+
+
+metrics = Metrics()
+
+
+class ConnectionPool(object):
+    RETRY_METHODS = ('GET', 'HEAD')  # idempotent, may be sent twice
+    STALE_CONNECTION_ERRNOS = (errno.ECONNRESET, errno.EPIPE)
+
+    def __init__(self, host=None, max_connections=DEFAULT_MAX_CONNECTIONS, max_idle_time=DEFAULT_MAX_IDLE_TIME):
+        super(ConnectionPool, self).__init__()
+        self.host = host or HOST
+        self.max_connections = int(max_connections)
+        self.max_idle_time = float(max_idle_time)
+        self._idle_connections = collections.deque()
+        self._lock = threading.Lock()
+
+    def _new_connection(self, timeout=None):
+        return httplib.HTTPConnection(self.host, timeout=timeout)
+
+    def _acquire(self, timeout=None):
+        now = time.time()
+        with self._lock:
+            while self._idle_connections:
+                connection, last_used = self._idle_connections.pop()  # LIFO --> most recently used one first
+                if now - last_used <= self.max_idle_time:
+                    connection.timeout = timeout
+                    if connection.sock is not None:
+                        connection.sock.settimeout(timeout)
+                    return connection, True
+                connection.close()
+        return self._new_connection(timeout=timeout), False
+
+    @staticmethod
+    def _send(connection, method, url_path, body, headers):
         connection.request(method, url_path, body, headers)
-        response = connection.getresponse()
-        headers = dict((k.lower(), v) for k, v in response.getheaders())
-        result = response.read() or ''
-        if result[:2] == b'\037\213':  # probe for gzip header
-            with closing(gzip.GzipFile(fileobj=StringIO(result))) as f:
-                result = f.read()
-        return response.status, result, headers
+        return connection.getresponse()
+
+    @classmethod
+    def is_stale_connection_error(cls, error):
+        # the server closed the kept-alive connection before answering: nothing but an empty status line or a reset
+        if isinstance(error, socket.timeout):
+            return False
+        if isinstance(error, httplib.BadStatusLine):
+            return error.line in ('', "''")
+        if isinstance(error, socket.error):
+            return error.errno in cls.STALE_CONNECTION_ERRNOS
+        return False
+
+    def open(self, method, url_path, body, headers, timeout=None):
+        # sends the request and returns the connection and the response, whose body is still to be read
+        connection, reused = self._acquire(timeout=timeout)
+        try:
+            return connection, self._send(connection, method, url_path, body, headers)
+        except Exception as error:
+            connection.close()
+            if not (reused and method in self.RETRY_METHODS and self.is_stale_connection_error(error)):
+                raise  # timeouts and non-idempotent requests are never sent twice
+        connection = self._new_connection(timeout=timeout)  # stale keep-alive connection --> reconnect once
+        try:
+            return connection, self._send(connection, method, url_path, body, headers)
+        except Exception:
+            connection.close()
+            raise
+
+    def release(self, connection, response):
+        # the response has to be read completely before its connection can be reused
+        if not response.will_close:
+            with self._lock:
+                if len(self._idle_connections) < self.max_connections:
+                    self._idle_connections.append((connection, time.time()))
+                    return
+        connection.close()
+
+    def request(self, method, url_path, body, headers, timeout=None):
+        connection, response = self.open(method, url_path, body, headers, timeout=timeout)
+        try:
+            result = response.read() or ''
+        except Exception:
+            connection.close()
+            raise
+        self.release(connection, response)
+        return response, result
+
+    def close(self):
+        with self._lock:
+            while self._idle_connections:
+                connection, _ = self._idle_connections.pop()
+                connection.close()
+
+
+class ResponseCache(object):
+
+    def __init__(self, cache_dir=None, max_size=DEFAULT_CACHE_SIZE):
+        super(ResponseCache, self).__init__()
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_size = int(max_size)
+        self._size = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(endpoint, params=None):
+        return endpoint + '?' + urllib.urlencode(sorted((params or dict()).items()))
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha1(key).hexdigest() + '.json')
+
+    def _entries(self):
+        entries = list()
+        for filename in os.listdir(self.cache_dir):
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, filename))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, os.path.join(self.cache_dir, filename)))
+        return entries
+
+    def _evict(self):
+        # least recently used entries go first, get() touches the entries it reads. Some room is left, or else every
+        # following set() would list the whole cache directory again.
+        entries = sorted(self._entries())
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._size <= self.max_size * CACHE_LOW_WATER_MARK:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
+
+    def get_size(self):
+        # bytes taken by the entries, listed once and then kept up to date
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries()) if os.path.isdir(self.cache_dir) else 0
+            return self._size
+
+    def get_entry(self, key):
+        # a dict with payload, expires_at (None: never expires) and the validators etag/last_modified, or None
+        path = self._path(key)
+        try:
+            with open(path, mode='rb') as cache_file:
+                entry = json.load(cache_file)
+            os.utime(path, None)
+        except (IOError, OSError, ValueError):
+            return None
+        return entry
+
+    def get(self, key):
+        # returns (payload, expires_at), expires_at is None for entries that never expire
+        entry = self.get_entry(key) or dict()
+        return entry.get('payload'), entry.get('expires_at')
+
+    def set(self, key, payload, ttl=None, etag=None, last_modified=None, size=None):
+        # size: the number of bytes the response took on the wire
+        entry = json.dumps(dict(key=key, payload=payload, expires_at=None if ttl is None else time.time() + ttl,
+                                etag=etag, last_modified=last_modified, size=size))
+        with self._lock:
+            write_file_atomically(self._path(key), entry)
+            self._added(len(entry))
+
+    def _added(self, size):
+        # call with self._lock held
+        if self._size is None:
+            self._evict()
+        else:
+            self._size += size
+            if self._size > self.max_size:
+                self._evict()
+
+
+class ImageCache(ResponseCache):
+    # channel logos and thumbnails as plain files named after their URL, evicted like ResponseCache entries
+
+    IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif')
+
+    def __init__(self, cache_dir=None, max_size=DEFAULT_IMAGE_CACHE_SIZE, connection_pool=None):
+        super(ImageCache, self).__init__(cache_dir or DEFAULT_IMAGE_CACHE_DIR, max_size=max_size)
+        self._connection_pool = connection_pool or ConnectionPool()
+        self._missing = list()  # URLs resolve() could not serve locally, see prefetch()
+
+    def _path(self, url):
+        extension = os.path.splitext(urlparse.urlsplit(url).path)[1].lower()
+        return os.path.join(self.cache_dir, hashlib.sha1(url).hexdigest() +
+                            (extension if extension in self.IMAGE_EXTENSIONS else ''))
+
+    def get(self, url):
+        # returns the path of the cached image or None
+        path = self._path(url)
+        try:
+            if os.stat(path).st_mtime < time.time() - IMAGE_TOUCH_INTERVAL:
+                os.utime(path, None)
+        except OSError:
+            return None
+        return path
+
+    def resolve(self, url):
+        # the local path if the image is cached, the URL otherwise (which is remembered for prefetch())
+        if not url:
+            return url
+        path = self.get(url)
+        if path is None:
+            self._missing.append(url)
+        metrics.count('cache_miss images' if path is None else 'cache_hit images')
+        return path or url
+
+    def fetch(self, url, timeout=None):
+        _, host, url_path, query, _ = urlparse.urlsplit(url)
+        if host != self._connection_pool.host:
+            raise ValueError('not a {0} URL: "{1}"'.format(self._connection_pool.host, url))
+        status, data, _ = http_request('GET', url_path + ('?' + query if query else ''), timeout=timeout,
+                                       connection_pool=self._connection_pool)
+        if status == httplib.NOT_FOUND:
+            raise NotFoundError(url)
+        elif status != httplib.OK:
+            raise Error('unexpected HTTP status {0} for "{1}"'.format(status, url))
+        with self._lock:
+            write_file_atomically(self._path(url), data)
+            self._added(len(data))
+        return self._path(url)
+
+    def prefetch(self, urls=None, max_workers=DEFAULT_MAX_WORKERS, timeout=None):
+        # downloads all images which are not cached yet (default: the ones resolve() missed), returns failed URLs
+        if urls is None:
+            urls, self._missing = self._missing, list()
+        urls = [url for url in collections.OrderedDict.fromkeys(urls) if url and self.get(url) is None]
+        results = run_concurrently(lambda url: self.fetch(url, timeout=timeout), urls, max_workers=max_workers)
+        return tuple(url for url, (_, error) in zip(urls, results) if error is not None)
+
+    def close(self):
+        self._connection_pool.close()
+
+
+class LazySequence(collections.Sequence):
+    # items which are decoded on access only, e.g. the page shown out of many search results
+
+    def __init__(self, items, decode):
+        super(LazySequence, self).__init__()
+        self._items = items
+        self._decode = decode
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self._decode(item) for item in self._items[index])
+        return self._decode(self._items[index])
+
+
+class SearchIndex(object):
+    # inverted index over broadcasts in a sqlite database, updated a day (channel and date) at a time so that
+    # neither adding nor searching has to read the whole index
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS days (channel_id INTEGER, date TEXT, broadcast_ids TEXT,
+                                         PRIMARY KEY (channel_id, date));
+        CREATE TABLE IF NOT EXISTS documents (id INTEGER PRIMARY KEY, channel_id INTEGER, date TEXT,
+                                              starts_at INTEGER, ends_at INTEGER, data TEXT);
+        CREATE INDEX IF NOT EXISTS documents_day ON documents (channel_id, date);
+        CREATE TABLE IF NOT EXISTS words (word TEXT, id INTEGER);
+        CREATE UNIQUE INDEX IF NOT EXISTS words_word ON words (word, id);
+        CREATE INDEX IF NOT EXISTS words_id ON words (id);
+    '''
+
+    def __init__(self, path=None, retention=DEFAULT_SEARCH_INDEX_RETENTION):
+        super(SearchIndex, self).__init__()
+        self.path = path or DEFAULT_SEARCH_INDEX_PATH
+        self.retention = retention
+        self._connection = None
+        self._lock = threading.RLock()
+
+    def _connect(self):
+        # sqlite3 is imported on first use only, the addon's pages without a search do not need it
+        if self._connection is None:
+            import sqlite3
+            if not os.path.isdir(os.path.dirname(self.path)):
+                os.makedirs(os.path.dirname(self.path))
+            for attempt in range(2):
+                connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+                try:
+                    connection.execute('PRAGMA synchronous = OFF')  # the index can be rebuilt, no need to fsync
+                    connection.executescript(self.SCHEMA)
+                except sqlite3.DatabaseError:
+                    connection.close()
+                    if attempt:
+                        raise
+                    os.remove(self.path)  # not a database (any more) --> start over
+                else:
+                    self._connection = connection
+                    break
+        return self._connection
+
+    @staticmethod
+    def _split_document(data):
+        fields = [data.get('title'), data.get('subtitle'), data.get('short_text')]
+        fields.extend(category.get('name') for category in data.get('categories') or ())
+        return set(itertools.chain(*(split_search_terms(html_unescape(field)) for field in fields if field)))
+
+    @staticmethod
+    def _remove_day(connection, channel_id, date):
+        connection.execute('DELETE FROM words WHERE id IN (SELECT id FROM documents WHERE channel_id = ? AND '
+                           'date = ?)', (channel_id, date))
+        connection.execute('DELETE FROM documents WHERE channel_id = ? AND date = ?', (channel_id, date))
+        connection.execute('DELETE FROM days WHERE channel_id = ? AND date = ?', (channel_id, date))
+
+    def add_day(self, channel_id, date, broadcasts):
+        # replaces the broadcasts of channel_id's day, date as API.get_broadcasts() takes it
+        channel_id = int(channel_id)
+        broadcast_ids = ','.join(str(broadcast_id) for broadcast_id in sorted(data['id'] for data in broadcasts))
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute('SELECT broadcast_ids FROM days WHERE channel_id = ? AND date = ?',
+                                     (channel_id, date)).fetchone()
+            if row is not None and row[0] == broadcast_ids:
+                return  # nothing new
+            with connection:  # one transaction per day
+                self._remove_day(connection, channel_id, date)
+                for data in broadcasts:
+                    connection.execute('DELETE FROM words WHERE id = ?', (data['id'],))  # listed on another day
+                    connection.execute('INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?)', (
+                        data['id'], channel_id, date, data['starts_at_ms'], data['ends_at_ms'],
+                        json.dumps(data, separators=(',', ':'))))
+                    connection.executemany('INSERT OR IGNORE INTO words VALUES (?, ?)', (
+                        (word, data['id']) for word in self._split_document(data)))
+                connection.execute('INSERT INTO days VALUES (?, ?, ?)', (channel_id, date, broadcast_ids))
+
+    def covers(self, channel_ids, dates):
+        # whether the days of all channel_ids and dates are in the index
+        with self._lock:
+            days = set(self._connect().execute('SELECT channel_id, date FROM days'))
+        return all((int(channel_id), date) in days for channel_id in channel_ids for date in dates)
+
+    def search(self, search_pattern, channel_id=None, start=None, end=None):
+        # every word of search_pattern has to match (a prefix of) a word of the broadcast, start/end are timestamps.
+        # The broadcasts are decoded as they are accessed.
+        prefixes = split_search_terms(search_pattern)
+        if not prefixes:
+            return tuple()
+        conditions, params = list(), list()
+        for prefix in sorted(set(prefixes), key=len, reverse=True):  # longest (most selective) prefixes first
+            conditions.append('id IN (SELECT id FROM words WHERE word >= ? AND word < ?)')
+            params.extend((prefix, prefix + u'\uffff'))  # all words starting with prefix
+        for condition, value in (('channel_id = ?', channel_id), ('ends_at > ?', start), ('starts_at < ?', end)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(int(value))
+        with self._lock:
+            rows = self._connect().execute('SELECT data FROM documents WHERE {0} ORDER BY starts_at'.format(
+                ' AND '.join(conditions)), params).fetchall()
+        return LazySequence([data for data, in rows], json.loads)
+
+    def prune(self):
+        # drops the days which ended longer than retention ago
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                for channel_id, date in connection.execute(
+                        'SELECT channel_id, date FROM documents GROUP BY channel_id, date HAVING MAX(ends_at) < ?',
+                        (int(time.time() - self.retention),)).fetchall():
+                    self._remove_day(connection, channel_id, date)
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class GuideSnapshot(object):
+    # the broadcasts of many channels and days in one binary file, memory mapped so that reading a channel's day
+    # touches that slice only. Layout (little endian):
+    #   header    magic, version, created_at, number of segments, rows and strings, size of the string data
+    #   segments  (channel_id, date as ordinal, first row, number of rows, expires_at or 0) per channel and day
+    #   columns   one array per field in COLUMNS, rows sorted by channel and day
+    #   strings   n + 1 offsets into the UTF-8 string data, string 0 is None. Equal strings are stored once.
+
+    MAGIC = 'BTVGUIDE'
+    VERSION = 2
+    HEADER = struct.Struct('<8sHdIIII')
+    SEGMENT = struct.Struct('<IiIId')
+    INT_COLUMNS = (('id', 'I'), ('channel_id', 'I'), ('starts_at_ms', 'I'), ('ends_at_ms', 'I'),
+                   ('production_year', 'I'), ('season', 'I'), ('episode', 'I'), ('total_episodes', 'I'), ('hd', 'B'))
+    STRING_COLUMNS = ('title', 'subtitle', 'short_text', 'country', 'channel_name', 'categories', 'image')
+    COLUMNS = INT_COLUMNS + tuple((name, 'I') for name in STRING_COLUMNS)
+    CATEGORY_SEPARATOR = u'\x1f'
+
+    def __init__(self, path=None):
+        super(GuideSnapshot, self).__init__()
+        self.path = path or DEFAULT_GUIDE_SNAPSHOT_PATH
+        self.created_at = None
+        self._file = None
+        self._mmap = None
+        self._segments = None
+        self._column_offsets = dict()
+        self._string_offsets = None
+        self._string_data = None
+        self._strings = dict()
+
+    @staticmethod
+    def _ordinal(date):
+        day, month, year = [int(part) for part in date.split('-')]  # same format as API.get_broadcasts()
+        return datetime.date(year, month, day).toordinal()
+
+    def _open(self):
+        # the header and the segments are read on first access, a missing or unreadable file is an empty snapshot
+        if self._segments is not None:
+            return
+        self._segments = dict()
+        try:
+            self._file = open(self.path, mode='rb')
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, file_version, created_at, segments, rows, strings, _ = self.HEADER.unpack_from(self._mmap)
+        except (EnvironmentError, ValueError, struct.error):  # mmap.error, an empty file ...
+            return self.close(keep_segments=True)
+        if magic != self.MAGIC or file_version != self.VERSION:
+            return self.close(keep_segments=True)
+        offset = self.HEADER.size
+        for i in range(segments):
+            channel_id, ordinal, first, count, expires_at = self.SEGMENT.unpack_from(
+                self._mmap, offset + i * self.SEGMENT.size)
+            self._segments[(channel_id, ordinal)] = (first, count, expires_at or None)
+        offset += segments * self.SEGMENT.size
+        for name, code in self.COLUMNS:
+            self._column_offsets[name] = (offset, code)
+            offset += rows * struct.calcsize(code)
+        self._string_offsets = offset
+        self._string_data = offset + (strings + 1) * 4
+        self.created_at = created_at
+
+    def _string(self, string_id):
+        if string_id == 0:
+            return None
+        try:
+            return self._strings[string_id]
+        except KeyError:
+            start, end = struct.unpack_from('<II', self._mmap, self._string_offsets + 4 * (string_id - 1))
+            value = self._strings[string_id] = self._mmap[self._string_data + start:self._string_data + end].decode(
+                'utf-8')
+            return value
+
+    def get_broadcasts(self, channel_id, date, max_age=None):
+        # the broadcasts' data like API.get_broadcasts() returns it, None if the snapshot does not have that day, the
+        # day has expired (see write()) or the snapshot is older than max_age seconds
+        self._open()
+        now = time.time()
+        if max_age is not None and (self.created_at is None or now >= self.created_at + max_age):
+            return None
+        segment = self._segments.get((int(channel_id), self._ordinal(date)))
+        if segment is None or (segment[2] is not None and now >= segment[2]):
+            return None
+        first, count, _ = segment
+        columns = dict()
+        for name, code in self.COLUMNS:
+            offset, code = self._column_offsets[name]
+            columns[name] = struct.unpack_from('<{0}{1}'.format(count, code), self._mmap,
+                                               offset + first * struct.calcsize(code))
+        broadcasts = list()
+        for i in range(count):
+            data = dict((name, columns[name][i]) for name, _ in self.INT_COLUMNS)
+            data.update((name, self._string(columns[name][i])) for name in self.STRING_COLUMNS)
+            data['hd'] = bool(data['hd'])
+            data['production_year'] = data['production_year'] or None
+            serie = dict((name, data.pop(name)) for name in ('season', 'episode', 'total_episodes'))
+            data['serie'] = serie if any(serie.values()) else None
+            data['categories'] = [dict(name=name) for name in (data['categories'] or u'').split(
+                self.CATEGORY_SEPARATOR) if name]
+            data['image'] = dict(href=data['image']) if data['image'] else None
+            broadcasts.append(data)
+        return broadcasts
+
+    @classmethod
+    def write(cls, days, path=None, created_at=None, expires_at=None):
+        # days is an iterable of (channel_id, date, broadcasts' data) like API.get_broadcasts() returns it. The days
+        # from today on are outdated at expires_at (None: never), e.g. when the next snapshot should be there, the
+        # days before do not change anymore.
+        strings = dict()
+        string_data = list()
+        string_offsets = [0]
+
+        def intern(value):
+            if value is None:
+                return 0
+            value = value if type(value) is unicode else value.decode('utf-8')
+            string_id = strings.get(value)
+            if string_id is None:
+                string_data.append(value.encode('utf-8'))
+                string_offsets.append(string_offsets[-1] + len(string_data[-1]))
+                string_id = strings[value] = len(string_data)
+            return string_id
+
+        segments = dict()
+        for channel_id, date, broadcasts in days:
+            segments[(int(channel_id), cls._ordinal(date))] = broadcasts
+        columns = dict((name, list()) for name, _ in cls.COLUMNS)
+        segment_data = list()
+        today = datetime.date.today().toordinal()
+        for (channel_id, ordinal), broadcasts in sorted(segments.items()):
+            segment_data.append(cls.SEGMENT.pack(channel_id, ordinal, len(columns['id']), len(broadcasts),
+                                                 (expires_at or 0) if ordinal >= today else 0))
+            for data in broadcasts:
+                serie = data.get('serie') or dict()
+                values = dict(data, production_year=data.get('production_year') or 0, hd=1 if data.get('hd') else 0,
+                              season=serie.get('season') or 0, episode=serie.get('episode') or 0,
+                              total_episodes=serie.get('total_episodes') or 0)
+                for name, _ in cls.INT_COLUMNS:
+                    columns[name].append(int(values[name]))
+                for name in ('title', 'subtitle', 'short_text', 'country', 'channel_name'):
+                    columns[name].append(intern(data.get(name)))
+                columns['categories'].append(intern(cls.CATEGORY_SEPARATOR.join(
+                    category['name'] for category in data.get('categories') or () if category.get('name'))))
+                columns['image'].append(intern((data.get('image') or dict()).get('href')))
+        rows = len(columns['id'])
+        chunks = [cls.HEADER.pack(cls.MAGIC, cls.VERSION, time.time() if created_at is None else created_at,
+                                  len(segment_data), rows, len(string_data), string_offsets[-1])]
+        chunks.extend(segment_data)
+        chunks.extend(struct.pack('<{0}{1}'.format(rows, code), *columns[name]) for name, code in cls.COLUMNS)
+        chunks.append(struct.pack('<{0}I'.format(len(string_offsets)), *string_offsets))
+        chunks.extend(string_data)
+        write_file_atomically(path or DEFAULT_GUIDE_SNAPSHOT_PATH, ''.join(chunks))
+
+    def close(self, keep_segments=False):
+        if self._mmap is not None:
+            self._mmap.close()
+        if self._file is not None:
+            self._file.close()
+        self._mmap = self._file = None
+        self._strings = dict()
+        if not keep_segments:
+            self._segments = None
+
+
+class Session(object):
+    # one per user and process: keeps the cookie in memory, persists it and tracks when the session expires
+
+    _sessions = dict()
+    _sessions_lock = threading.Lock()
+
+    def __init__(self, username, password):
+        super(Session, self).__init__()
+        self.username = username
+        self.password = password
+        self.cookie = None
+        self.expires_at = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get(cls, username, password):
+        with cls._sessions_lock:
+            if (username, password) not in cls._sessions:
+                cls._sessions[(username, password)] = cls(username, password)
+            return cls._sessions[(username, password)]
+
+    @property
+    def cookie_path(self):
+        cookie_filename = self.username + '-' + str(zlib.adler32(self.username + '|' + self.password)) + '.cookie'
+        return os.path.join(DEFAULT_COOKIE_DIR, cookie_filename)
+
+    @staticmethod
+    def parse_expiry(set_cookie):
+        for attribute in set_cookie.split(';'):
+            name, _, value = attribute.strip().partition('=')
+            try:
+                if name.lower() == 'max-age':
+                    return time.time() + int(value)
+                elif name.lower() == 'expires':
+                    import email.utils  # on first use only, once per session
+                    return email.utils.mktime_tz(email.utils.parsedate_tz(value))
+            except (TypeError, ValueError):
+                continue
+        return time.time() + DEFAULT_SESSION_LIFETIME
+
+    def is_valid(self):
+        return self.cookie is not None and time.time() < self.expires_at
+
+    def _read(self):
+        try:
+            with open(self.cookie_path, mode='rb') as cookie_file:
+                data = cookie_file.read()
+        except (IOError, OSError):
+            return
+        try:
+            data = json.loads(data)
+            self.cookie, self.expires_at = str(data['cookie']), float(data['expires_at'])
+        except (ValueError, KeyError, TypeError):  # cookie files of older versions: the plain cookie
+            self.cookie, self.expires_at = data, os.path.getmtime(self.cookie_path) + DEFAULT_SESSION_LIFETIME
+
+    def _write(self):
+        write_file_atomically(self.cookie_path, json.dumps(dict(cookie=self.cookie, expires_at=self.expires_at)))
+
+    def get_cookie(self, login):
+        # login() is only called if neither memory nor disk hold a valid cookie, it returns the set-cookie header
+        with self._lock:
+            if not self.is_valid():
+                self._read()
+            if not self.is_valid():
+                set_cookie = login()
+                self.cookie, self.expires_at = set_cookie, self.parse_expiry(set_cookie)
+                self._write()
+            return self.cookie
+
+    def invalidate(self, cookie):
+        # the server rejected cookie, forget it unless another thread logged in again already
+        with self._lock:
+            if self.cookie == cookie:
+                self.cookie, self.expires_at = None, None
+                try:
+                    os.remove(self.cookie_path)
+                except OSError:
+                    pass
+
+
+class CircuitBreaker(object):
+    # fails fast after failure_threshold consecutive failures, lets one probe through every reset_timeout seconds.
+    # With a path, the state survives the process, e.g. the addon's, which lives for one click only.
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT, path=None):
+        super(CircuitBreaker, self).__init__()
+        self.failure_threshold = int(failure_threshold)
+        self.reset_timeout = float(reset_timeout)
+        self.path = path
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+        self._read()
+
+    def _read(self):
+        if self.path is not None:
+            try:
+                with open(self.path, mode='rb') as state_file:
+                    state = json.load(state_file)
+                self.failures, self.opened_at = int(state['failures']), state['opened_at']
+            except (IOError, OSError, ValueError, KeyError, TypeError):
+                pass  # no state yet, or a broken one --> closed
+
+    def _write(self):
+        # call with self._lock held
+        if self.path is not None:
+            try:
+                write_file_atomically(self.path, json.dumps(dict(failures=self.failures, opened_at=self.opened_at)))
+            except EnvironmentError:
+                pass  # the breaker still works for this process
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            elif time.time() - self.opened_at >= self.reset_timeout:
+                self.opened_at = time.time()  # half open --> one probe, everything else keeps failing fast
+                self._write()
+                return True
+            return False
+
+    def succeeded(self):
+        with self._lock:
+            if self.failures or self.opened_at is not None:
+                self.failures = 0
+                self.opened_at = None
+                self._write()
+
+    def failed(self):
+        with self._lock:
+            self.failures += 1
+            if 0 < self.failure_threshold <= self.failures:
+                self.opened_at = time.time()
+            self._write()
 
 
 class API(object):
 
-    def __init__(self, credentials=None, cookie=None):
+    def __init__(self, credentials=None, cookie=None, connection_pool=None, cache=None, stale_while_revalidate=True,
+                 policy=DEFAULT_TRANSPORT_POLICY, snapshot=None, circuit_breaker_dir=None):
         super(API, self).__init__()
+        self._connection_pool = connection_pool or ConnectionPool()
+        self._cache = cache
+        self.policy = policy
+        self._deadline = None if policy.budget is None else time.time() + policy.budget
+        self._circuit_breakers = dict()
+        self._circuit_breakers_lock = threading.Lock()
+        self.circuit_breaker_dir = circuit_breaker_dir  # None: the circuit breakers' state lives in memory only
+        self.stale_while_revalidate = stale_while_revalidate
+        self.snapshot = snapshot
+        self._revalidating = set()
+        self._cache_lock = threading.Lock()
+        self._session = None
+        self.conditional_stats = dict(requests=0, not_modified=0, bytes_saved=0)
         if isinstance(credentials, collections.Iterable):
             try:
                 username, password = tuple(credentials)
@@ -150,6 +1444,7 @@ class API(object):
             else:
                 self.username = str(username.encode('utf-8') if type(username) is unicode else username)
                 self.password = str(password.encode('utf-8') if type(password) is unicode else password)
+                self._session = Session.get(self.username, self.password)
         elif cookie is not None:
             c = None
             if isinstance(cookie, basestring):
@@ -166,6 +1461,250 @@ class API(object):
         else:
             raise Error('no user credentials, no cookie .. what now?!?')
 
+    def get_circuit_breaker(self, method, url_path):
+        endpoint = Metrics.endpoint(method.upper(), url_path)
+        with self._circuit_breakers_lock:
+            if endpoint not in self._circuit_breakers:
+                path = None if self.circuit_breaker_dir is None else os.path.join(
+                    self.circuit_breaker_dir, hashlib.sha1(endpoint).hexdigest() + '.json')
+                self._circuit_breakers[endpoint] = CircuitBreaker(self.policy.failure_threshold,
+                                                                  self.policy.reset_timeout, path=path)
+            return self._circuit_breakers[endpoint]
+
+    def _remaining_budget(self):
+        return None if self._deadline is None else self._deadline - time.time()
+
+    def _transport(self, method, url_path, send, timeout=None):
+        # calls send(timeout) --> (status, body, headers) under the transport policy: the timeout is cut to what is
+        # left of the budget, GET requests are retried with exponential backoff and jitter on connection errors,
+        # timeouts and 5xx, and every endpoint has a circuit breaker.
+        endpoint = Metrics.endpoint(method.upper(), url_path)
+        circuit_breaker = self.get_circuit_breaker(method, url_path)
+        attempts = 1 + (self.policy.retries if method.upper() == 'GET' else 0)
+        for attempt in range(attempts):
+            if not circuit_breaker.allow():
+                metrics.count('circuit_open ' + endpoint)
+                raise UnavailableError('{0} keeps failing, not asking again for now'.format(endpoint))
+            remaining = self._remaining_budget()
+            if remaining is not None and remaining <= 0:
+                metrics.count('budget_exceeded ' + endpoint)
+                raise UnavailableError('no time left for {0}'.format(endpoint))
+            request_timeout = timeout if timeout is not None else self.policy.timeout
+            if remaining is not None:
+                request_timeout = remaining if request_timeout is None else min(request_timeout, remaining)
+            try:
+                result = send(request_timeout)
+            except (socket.error, httplib.HTTPException) as error:
+                failure = error
+            else:
+                if result[0] < 500:
+                    circuit_breaker.succeeded()
+                    return result
+                failure = result
+            circuit_breaker.failed()
+            delay = min(self.policy.backoff * 2 ** attempt, self.policy.max_backoff) * random.uniform(0.5, 1.5)
+            remaining = self._remaining_budget()
+            if attempt + 1 == attempts or (remaining is not None and remaining <= delay):
+                break
+            if isinstance(failure, tuple) and not isinstance(failure[1], basestring):
+                for _ in failure[1]:
+                    pass  # read the streamed error up to the end, so that the connection can be reused
+            metrics.count('retry ' + endpoint)
+            time.sleep(delay)
+        if isinstance(failure, tuple):
+            return failure  # a 5xx response, _check_http_status() turns it into a ServerError
+        raise UnavailableError('{0} failed: {1!r}'.format(endpoint, failure))
+
+    def _http_request(self, method, url_path, params=None, headers=None, timeout=None, authorized=True):
+        def send(timeout):
+            cookie = self.cookie if authorized else None
+            result = http_request(method, url_path, cookie, params=params, headers=headers, timeout=timeout,
+                                  connection_pool=self._connection_pool)
+            if authorized and result[0] == httplib.UNAUTHORIZED and self._session is not None:
+                self._session.invalidate(cookie)  # session expired --> log in again, once
+                result = http_request(method, url_path, self.cookie, params=params, headers=headers,
+                                      timeout=timeout, connection_pool=self._connection_pool)
+            return result
+
+        return self._transport(method, url_path, send, timeout=timeout)
+
+    def _revalidate(self, key, fetch):
+        def revalidate():
+            try:
+                fetch()
+            except Exception:
+                pass  # keep serving the stale entry
+            finally:
+                self._revalidating.discard(key)
+
+        if key not in self._revalidating:
+            self._revalidating.add(key)
+            thread = threading.Thread(target=revalidate)
+            thread.start()  # no daemon thread --> the refresh gets a chance to finish before the interpreter exits
+
+    def _conditional_headers(self, entry):
+        headers = dict()
+        if entry is not None:
+            if entry.get('etag'):
+                headers['if-none-match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['if-modified-since'] = entry['last_modified']
+        if headers:
+            self.conditional_stats['requests'] += 1
+        return headers
+
+    def _not_modified(self, entry):
+        self.conditional_stats['not_modified'] += 1
+        self.conditional_stats['bytes_saved'] += entry.get('size') or 0
+        return entry['payload']
+
+    @staticmethod
+    def _degraded(entry, endpoint):
+        # bong.tv is unavailable --> an outdated payload is better than none, however old it is
+        metrics.count('cache_degraded ' + endpoint)
+        return entry['payload']
+
+    def _store(self, key, payload, entry, headers, ttl, size):
+        # size: the response's size on the wire, what a 304 for it saves
+        if self._cache is not None:
+            entry = entry or dict()
+            self._cache.set(key, payload, ttl=ttl, etag=headers.get('etag') or entry.get('etag'),
+                            last_modified=headers.get('last-modified') or entry.get('last_modified'), size=size)
+
+    def _get_json(self, url_path, name, params=None, ttl=0, stale_while_revalidate=True, timeout=None):
+        # returns the value at name of url_path's JSON. Cached responses are served while fresh, served while being
+        # revalidated in the background once stale, or else revalidated with a conditional request (ETag/304).
+        key = ResponseCache.make_key(url_path, params)
+        endpoint = Metrics.endpoint('GET', url_path)
+        entry = self._cache.get_entry(key) if self._cache is not None else None
+        stale_while_revalidate = stale_while_revalidate and self.stale_while_revalidate
+
+        def fetch():
+            status, data, headers = self._http_request('GET', url_path, params=params, timeout=timeout,
+                                                       headers=self._conditional_headers(entry))
+            if status == httplib.NOT_MODIFIED and entry is not None:
+                payload = self._not_modified(entry)
+                size = entry.get('size')  # not the 304's content-length of 0
+                metrics.count('cache_not_modified ' + endpoint)
+            elif self._check_http_status(status):
+                with metrics.timer('json ' + endpoint):
+                    payload = json.loads(data).get(name) or dict()
+                size = int(headers.get('content-length') or len(data))
+            self._store(key, payload, entry, headers, ttl, size)
+            return payload
+
+        if entry is not None:
+            now = time.time()
+            if entry['expires_at'] is None or now < entry['expires_at']:
+                metrics.count('cache_hit ' + endpoint)
+                return entry['payload']
+            elif stale_while_revalidate and now < entry['expires_at'] + DEFAULT_MAX_STALENESS:
+                metrics.count('cache_stale ' + endpoint)
+                self._revalidate(key, fetch)
+                return entry['payload']
+        if self._cache is not None:
+            metrics.count('cache_miss ' + endpoint)
+        try:
+            return fetch()
+        except ServerError:
+            if entry is None:
+                raise
+            return self._degraded(entry, endpoint)
+
+    def _iter_json(self, url_path, name, params=None, ttl=0, stale_while_revalidate=True, timeout=None):
+        # streaming counterpart of _get_json(), a stale entry is revalidated by _get_json() in the background
+        key = ResponseCache.make_key(url_path, params)
+        endpoint = Metrics.endpoint('GET', url_path)
+        entry = self._cache.get_entry(key) if self._cache is not None else None
+        if entry is not None:
+            now = time.time()
+            if entry['expires_at'] is None or now < entry['expires_at']:
+                metrics.count('cache_hit ' + endpoint)
+                return iter(entry['payload'])
+            elif (stale_while_revalidate and self.stale_while_revalidate and
+                  now < entry['expires_at'] + DEFAULT_MAX_STALENESS):
+                metrics.count('cache_stale ' + endpoint)
+                self._revalidate(key, lambda: self._get_json(url_path, name, params=params, ttl=ttl,
+                                                             stale_while_revalidate=False, timeout=timeout))
+                return iter(entry['payload'])
+        if self._cache is not None:
+            metrics.count('cache_miss ' + endpoint)
+        try:
+            status, chunks, headers = self._http_stream('GET', url_path, params=params, timeout=timeout,
+                                                        headers=self._conditional_headers(entry))
+        except ServerError:
+            if entry is None:
+                raise
+            return iter(self._degraded(entry, endpoint))
+        if entry is not None and (status == httplib.NOT_MODIFIED or status >= 500):
+            for _ in chunks:
+                pass  # read up to the end, so that the connection can be reused
+            if status >= 500:
+                return iter(self._degraded(entry, endpoint))
+            metrics.count('cache_not_modified ' + endpoint)
+            return iter(self._not_modified(entry))
+        elif self._check_http_status(status):
+            if self._cache is None:
+                return iter_json_array(chunks, name)
+
+            def producer():
+                items = list()
+                for item in iter_json_array(chunks, name):
+                    items.append(item)
+                    yield item
+                self._store(key, items, entry, headers, ttl, int(headers.get('content-length') or 0))
+
+            return producer()
+
+    def _update_cached(self, url_path, update, params=None):
+        # changes a cached payload in place, its validators are dropped as they do not match the new payload anymore
+        if self._cache is not None:
+            key = ResponseCache.make_key(url_path, params)
+            with self._cache_lock:  # bulk operations update concurrently
+                entry = self._cache.get_entry(key)
+                if entry is not None:
+                    ttl = None if entry['expires_at'] is None else max(entry['expires_at'] - time.time(), 0)
+                    self._cache.set(key, update(entry['payload']), ttl=ttl)
+
+    @staticmethod
+    def _broadcasts_ttl(date):
+        day = tuple(reversed([int(part) for part in date.split('-')]))  # no time.strptime(), it's not thread-safe
+        today = time.localtime()[:3]
+        if day < today:
+            return None  # the past does not change anymore
+        elif day == today:
+            return TODAYS_BROADCASTS_TTL
+        else:
+            return UPCOMING_BROADCASTS_TTL
+
+    def _http_stream(self, method, url_path, params=None, headers=None, timeout=None):
+        # the transport policy covers everything up to the response headers, not reading the body
+        def send(timeout):
+            cookie = self.cookie
+            result = http_stream(method, url_path, cookie, params=params, headers=headers, timeout=timeout,
+                                 connection_pool=self._connection_pool)
+            if result[0] == httplib.UNAUTHORIZED and self._session is not None:
+                for _ in result[1]:
+                    pass  # read up to the end, so that the connection can be reused
+                self._session.invalidate(cookie)  # session expired --> log in again, once
+                result = http_stream(method, url_path, self.cookie, params=params, headers=headers,
+                                     timeout=timeout, connection_pool=self._connection_pool)
+            return result
+
+        return self._transport(method, url_path, send, timeout=timeout)
+
+    def close(self):
+        self._connection_pool.close()
+        if self.snapshot is not None:
+            self.snapshot.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
     def _check_http_status(self, status):
         if 100 <= status <= 299:  # 100er range --> informative, 200er range --> everything OK
             return True
@@ -185,110 +1724,215 @@ class API(object):
         else:
             raise Error('unexpected HTTP error {0}'.format(status))
 
-    @staticmethod
-    def _write_cookie(cookie, cookie_filename):
-        if not os.path.isdir(DEFAULT_COOKIE_DIR):
-            os.makedirs(DEFAULT_COOKIE_DIR)
-        cookie_path = os.path.join(DEFAULT_COOKIE_DIR, cookie_filename)
-        with open(cookie_path, mode='wt') as cookie_file:
-            cookie_file.write(cookie)
+    def _login(self):
+        params = dict(login=self.username, password=self.password)
+        status, data, headers = self._http_request('POST', '/api/v1/user_sessions.json', params=params,
+                                                    authorized=False)
+        if self._check_http_status(status):
+            if not headers.get('set-cookie'):
+                raise ValueError('no cookie')
+            return headers['set-cookie']
+
+    cache = property(lambda self: self._cache)  # the ResponseCache or None
 
     @property
     def cookie(self):
-        if not hasattr(self, '___cookie'):
-            cookie = None
-            cookie_filename = self.username + '-' + str(zlib.adler32(self.username + '|' + self.password)) + '.cookie'
-            cookie_path = os.path.join(DEFAULT_COOKIE_DIR, cookie_filename)
-            if os.path.isfile(cookie_path):
-                cookie = open(cookie_path, mode='rt').read()
-            else:
-                params = dict(login=self.username, password=self.password)
-                status, data, headers = http_request('POST', '/api/v1/user_sessions.json', params=params)
-                if self._check_http_status(status):
-                    cookie = headers['set-cookie']
-                    self._write_cookie(cookie, cookie_path)
-            if cookie is None:
-                raise ValueError('no cookie')
-            setattr(self, '___cookie', cookie)
+        if self._session is not None:
+            return self._session.get_cookie(self._login)
         return getattr(self, '___cookie')
 
     def list_user_recordings(self, timeout=None):
-        status, data, _ = http_request('GET', '/api/v1/recordings.json', self.cookie, timeout=timeout)
-        if self._check_http_status(status):
-            return json.loads(data).get('recordings') or dict()
+        return self._get_json('/api/v1/recordings.json', 'recordings', ttl=RECORDINGS_TTL,
+                              stale_while_revalidate=False, timeout=timeout)
+
+    def iter_user_recordings(self, timeout=None):
+        # like list_user_recordings, but decodes the recordings one by one while the response comes in. Stale
+        # recordings are served while they are revalidated, the service keeps them from getting old.
+        return self._iter_json('/api/v1/recordings.json', 'recordings', ttl=RECORDINGS_TTL, timeout=timeout)
 
     def create_recording(self, broadcast_id, timeout=None):
         params = dict(broadcast_id=int(broadcast_id))
-        status, data, _ = http_request('POST', '/api/v1/recordings.json', self.cookie, params=params, timeout=timeout)
+        status, data, _ = self._http_request('POST', '/api/v1/recordings.json', params=params, timeout=timeout)
         if self._check_http_status(status):
-            return json.loads(data).get('recording') or dict()
+            recording = json.loads(data).get('recording') or dict()
+            if recording:
+                self._update_cached('/api/v1/recordings.json', lambda recordings: [
+                    data for data in recordings if data['id'] != recording['id']] + [recording])
+            return recording
 
     def delete_recording(self, recording_id, timeout=None):
-        status, _, _ = http_request('DELETE', '/api/v1/recordings/{0}.json'.format(int(recording_id)), self.cookie,
-                               timeout=timeout)
+        status, _, _ = self._http_request('DELETE', '/api/v1/recordings/{0}.json'.format(int(recording_id)),
+                                          timeout=timeout)
+        if 200 <= status <= 299 or status == httplib.NOT_FOUND:  # the recording is gone either way
+            self._update_cached('/api/v1/recordings.json', lambda recordings: [
+                data for data in recordings if data['id'] != int(recording_id)])
         self._check_http_status(status)
 
     def list_channels(self, timeout=None):
-        status, data, _ = http_request('GET', '/api/v1/channels.json', self.cookie, timeout=timeout)
-        if self._check_http_status(status):
-            return json.loads(data).get('channels') or dict()
+        return self._get_json('/api/v1/channels.json', 'channels', ttl=CHANNELS_TTL, timeout=timeout)
 
     def get_broadcasts(self, channel_id, date, timeout=None):
+        if self.snapshot is not None:  # its days expire when the next snapshot is due, not with the TTL
+            broadcasts = self.snapshot.get_broadcasts(channel_id, date)
+            if broadcasts is not None:
+                metrics.count('snapshot_hit GET /api/v1/broadcasts.json')
+                return broadcasts
         params = dict(channel_id=int(channel_id), date=date)
-        status, data, _ = http_request('GET', '/api/v1/broadcasts.json', self.cookie, params=params, timeout=timeout)
-        if self._check_http_status(status):
-            return json.loads(data).get('broadcasts') or dict()
+        return self._get_json('/api/v1/broadcasts.json', 'broadcasts', params=params, ttl=self._broadcasts_ttl(date),
+                              timeout=timeout)
 
     def get_broadcast_details(self, broadcast_id, timeout=None):
-        status, data, _ = http_request('GET', '/api/v1/broadcasts/{0}.json'.format(int(broadcast_id)), self.cookie,
-                                  timeout=timeout)
+        status, data, _ = self._http_request('GET', '/api/v1/broadcasts/{0}.json'.format(int(broadcast_id)),
+                                             timeout=timeout)
         if self._check_http_status(status):
             return json.loads(data).get('broadcast') or dict()
 
     def search_broadcasts(self, search_pattern, timeout=None):
-        params = dict(query=search_pattern)
-        status, data, _ = http_request('GET', '/api/v1/broadcasts/search.json', self.cookie, params=params,
-                                       timeout=timeout)
-        if self._check_http_status(status):
-            return json.loads(data).get('broadcasts') or dict()
+        return self._get_json('/api/v1/broadcasts/search.json', 'broadcasts', params=dict(query=search_pattern),
+                              ttl=SEARCH_TTL, stale_while_revalidate=False, timeout=timeout)
+
+    def iter_search_broadcasts(self, search_pattern, timeout=None):
+        # like search_broadcasts, but decodes the broadcasts one by one while the response comes in
+        return self._iter_json('/api/v1/broadcasts/search.json', 'broadcasts', params=dict(query=search_pattern),
+                               ttl=SEARCH_TTL, stale_while_revalidate=False, timeout=timeout)
+
+
+class AsyncAPI(object):
+    # API's calls as Futures running on an EventLoop, sharing the API's connection pool, cache and session
+
+    def __init__(self, api, loop=None):
+        super(AsyncAPI, self).__init__()
+        if not type(api) is API:
+            raise TypeError('expected type "{0}", got "{1}" instead'.format(API, type(api)))
+        self.api = api
+        self.loop = loop or get_event_loop()
+
+    def list_user_recordings(self, timeout=None):
+        return self.loop.submit(self.api.list_user_recordings, timeout=timeout)
+
+    def create_recording(self, broadcast_id, timeout=None):
+        return self.loop.submit(self.api.create_recording, broadcast_id, timeout=timeout)
+
+    def delete_recording(self, recording_id, timeout=None):
+        return self.loop.submit(self.api.delete_recording, recording_id, timeout=timeout)
+
+    def list_channels(self, timeout=None):
+        return self.loop.submit(self.api.list_channels, timeout=timeout)
+
+    def get_broadcasts(self, channel_id, date, timeout=None):
+        return self.loop.submit(self.api.get_broadcasts, channel_id, date, timeout=timeout)
+
+    def get_broadcast_details(self, broadcast_id, timeout=None):
+        return self.loop.submit(self.api.get_broadcast_details, broadcast_id, timeout=timeout)
+
+    def search_broadcasts(self, search_pattern, timeout=None):
+        return self.loop.submit(self.api.search_broadcasts, search_pattern, timeout=timeout)
+
+    def close(self):
+        self.api.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+class lazy_attribute(object):
+    # like property, but decodes the value on first access only and keeps it in the slot "_" + name
+
+    def __init__(self, fget):
+        self.fget = fget
+        self.slot = '_' + fget.__name__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        try:
+            return getattr(instance, self.slot)
+        except AttributeError:
+            value = self.fget(instance)
+            setattr(instance, self.slot, value)
+            return value
 
 
 class Broadcast(object):
+    # keeps the raw JSON data and decodes fields lazily, most broadcasts of a guide are never looked at in detail
+
+    __slots__ = ('_api', '_data', '_broadcast_details_data', '_title', '_subtitle', '_country', '_outline',
+                 '_channel_name', '_categories', '_starts_at', '_ends_at', '_thumb_url')
+
     def __init__(self, data, api):
         super(Broadcast, self).__init__()
         if not type(api) is API:
             raise TypeError('expected type "{0}", got "{1}" instead'.format(API, type(api)))
         self._api = api
-        self.broadcast_id = data['id']
-        self.title = html_unescape(data['title'])
-        self.subtitle = html_unescape(data['subtitle'])
-        self.production_year = data['production_year']
-        self.starts_at = time.localtime(data['starts_at_ms'])
-        self.ends_at = time.localtime(data['ends_at_ms'])
-        self.duration_in_secs = data['ends_at_ms'] - data['starts_at_ms']
-        self.duration = int(self.duration_in_secs / 60.)
-        self.country = html_unescape(data['country'])
-        thumb_url_path = ((data.get('image') or dict()).get('href') or u'').encode('utf-8')
-        self.thumb_url = ('http://' + HOST + thumb_url_path) if thumb_url_path else ''
-        self.channel_id = data['channel_id']
-        self.channel_logo_url = 'http://{host}/images/channel/b/{channel_id}.png'.format(host=HOST,
-                                                                                         channel_id=self.channel_id)
-        self.season = int((data.get('serie') or dict()).get('season') or 0)
-        self.episode = int((data.get('serie') or dict()).get('episode') or 0)
-        self.total_episodes = int((data.get('serie') or dict()).get('total_episodes') or 0)
+        self._data = data
+
+    broadcast_id = property(lambda self: self._data['id'])
+    production_year = property(lambda self: self._data['production_year'])
+    # despite its name, bong.tv sends seconds since the epoch
+    start_timestamp = property(lambda self: self._data['starts_at_ms'])
+    end_timestamp = property(lambda self: self._data['ends_at_ms'])
+    duration_in_secs = property(lambda self: self._data['ends_at_ms'] - self._data['starts_at_ms'])
+    duration = property(lambda self: int(self.duration_in_secs / 60.))
+    channel_id = property(lambda self: self._data['channel_id'])
+    season = property(lambda self: int((self._data.get('serie') or dict()).get('season') or 0))
+    episode = property(lambda self: int((self._data.get('serie') or dict()).get('episode') or 0))
+    total_episodes = property(lambda self: int((self._data.get('serie') or dict()).get('total_episodes') or 0))
+    hd = property(lambda self: True if self._data['hd'] else False)
+
+    @lazy_attribute
+    def title(self):
+        return html_unescape(self._data['title'])
+
+    @lazy_attribute
+    def subtitle(self):
+        return html_unescape(self._data['subtitle'])
+
+    @lazy_attribute
+    def country(self):
+        return html_unescape(self._data['country'])
+
+    @lazy_attribute
+    def outline(self):
+        return html_unescape(self._data['short_text'])
+
+    @lazy_attribute
+    def channel_name(self):
+        return html_unescape(self._data['channel_name'])
+
+    @lazy_attribute
+    def categories(self):
         # FIXME categories is a tree-like structure
-        self.categories = set(html_unescape(category['name']) for category in data['categories']
-                              if category.get('name'))
-        self.outline = html_unescape(data['short_text'])
-        self.hd = True if data['hd'] else False
-        self.channel_name = html_unescape(data['channel_name'])
+        return set(html_unescape(category['name']) for category in self._data['categories'] if category.get('name'))
+
+    @lazy_attribute
+    def starts_at(self):
+        return time.localtime(self._data['starts_at_ms'])
+
+    @lazy_attribute
+    def ends_at(self):
+        return time.localtime(self._data['ends_at_ms'])
+
+    @lazy_attribute
+    def thumb_url(self):
+        thumb_url_path = ((self._data.get('image') or dict()).get('href') or u'').encode('utf-8')
+        return ('http://' + HOST + thumb_url_path) if thumb_url_path else ''
+
+    @property
+    def channel_logo_url(self):
+        return 'http://{host}/images/channel/b/{channel_id}.png'.format(host=HOST, channel_id=self.channel_id)
 
     @property
     def _broadcast_details(self):
-        if not hasattr(self, '___broadcast_details'):
-            broadcast_details = self._api.get_broadcast_details(self.broadcast_id)
-            setattr(self, '___broadcast_details', broadcast_details)
-        return getattr(self, '___broadcast_details')
+        if not self.has_broadcast_details():
+            self._broadcast_details_data = self._api.get_broadcast_details(self.broadcast_id)
+        return self._broadcast_details_data
+
+    def has_broadcast_details(self):
+        return hasattr(self, '_broadcast_details_data')
 
     @property
     def rating(self):
@@ -339,13 +1983,20 @@ class Recording(Broadcast):
 
     QUALITIES = QUALITY_HD, QUALITY_HQ, QUALITY_NQ = 'HD', 'HQ', 'NQ'
 
+    __slots__ = ('_recording_data', '_urls')
+
     def __init__(self, data, api):
         super(Recording, self).__init__(data['broadcast'], api)
-        self.status = data['status']
-        self.quality = data['quality']
-        self.recording_id = data['id']
-        self.urls = dict((file_data['quality'].upper(), file_data['href'].encode('utf-8'), ) for file_data in
-                         data['files'])
+        self._recording_data = data
+
+    status = property(lambda self: self._recording_data['status'])
+    quality = property(lambda self: self._recording_data['quality'])
+    recording_id = property(lambda self: self._recording_data['id'])
+
+    @lazy_attribute
+    def urls(self):
+        return dict((file_data['quality'].upper(), file_data['href'].encode('utf-8'), ) for file_data in
+                    self._recording_data['files'])
 
     def is_recorded(self):
         return self.status.lower() == 'recorded'
@@ -366,67 +2017,216 @@ class Recording(Broadcast):
 
 
 class Channel(object):
+
+    __slots__ = ('_api', '_data')
+
     def __init__(self, data, api):
         super(Channel, self).__init__()
         if not type(api) is API:
             raise TypeError('expected type "{0}", got "{1}" instead'.format(API, type(api)))
         self._api = api
-        self.channel_id = data['id']
-        self.logo_url = 'http://{host}/images/channel/b/{channel_id}.png'.format(host=HOST, channel_id=self.channel_id)
-        self.name = data['name']
-        self.recordable = data['recordable']
-        self.position = data['position']
-        self.hd = data['hd']
+        self._data = data
+
+    channel_id = property(lambda self: self._data['id'])
+    name = property(lambda self: self._data['name'])
+    recordable = property(lambda self: self._data['recordable'])
+    position = property(lambda self: self._data['position'])
+    hd = property(lambda self: self._data['hd'])
+
+    @property
+    def logo_url(self):
+        return 'http://{host}/images/channel/b/{channel_id}.png'.format(host=HOST, channel_id=self.channel_id)
 
     def is_hd(self):
         return True if self.hd else False
 
-    def get_broadcasts_per_day(self, offset=0, timeout=None):
-        date = time.strftime('%d-%m-%Y', time.localtime(time.time() + (int(offset) * 3600 * 24)))
-        broadcasts = sorted([Broadcast(broadcast, self._api) for broadcast in self._api.get_broadcasts(
-            self.channel_id, date=date, timeout=timeout)], key=operator.attrgetter('starts_at'))
-        now = time.localtime()
-        return tuple(broadcast for broadcast in broadcasts if broadcast.starts_at >= now)
-
-    def get_broadcasts(self, offset=7, timeout=None):
+    def get_broadcasts_per_date(self, date, timeout=None):
+        # all broadcasts of date (see get_date()) sorted by start time
+        data = self._api.get_broadcasts(self.channel_id, date=date, timeout=timeout)
+        with metrics.timer('models Broadcast'):
+            return tuple(sorted([Broadcast(broadcast, self._api) for broadcast in data],
+                                key=operator.attrgetter('start_timestamp')))
+
+    def get_broadcasts_per_day(self, offset=0, timeout=None, upcoming_only=True):
+        broadcasts = self.get_broadcasts_per_date(get_date(offset), timeout=timeout)
+        if not upcoming_only:
+            return tuple(broadcasts)
+        now = time.time()
+        return tuple(broadcast for broadcast in broadcasts if broadcast.start_timestamp >= now)
+
+    def get_broadcast_window(self, start, end, timeout=None, max_workers=DEFAULT_MAX_WORKERS):
+        # the broadcasts running at some point of [start, end) sorted by start time, see get_broadcast_window()
+        grid = get_broadcast_window([self], start, end, max_workers=max_workers, timeout=timeout)
+        if grid.errors:
+            raise grid.errors[self.channel_id]
+        return grid.broadcasts[self.channel_id]
+
+    def get_broadcasts(self, offset=7, timeout=None, max_workers=DEFAULT_MAX_WORKERS):
         def producer():
-            for i in range(offset):
-                broadcasts = self.get_broadcasts_per_day(offset=i, timeout=timeout)
-                if broadcasts:
+            for broadcasts, error in results:
+                if error is not None:
+                    raise error
+                elif broadcasts:
                     yield broadcasts
                 else:
                     break
 
+        results = run_concurrently(lambda i: self.get_broadcasts_per_day(offset=i, timeout=timeout), range(offset),
+                                   max_workers=max_workers)
+
         return tuple(itertools.chain(*tuple(producer())))
 
     broadcasts = property(fget=get_broadcasts)
 
+    def prefetch_broadcast_details(self, broadcasts, max_workers=DEFAULT_MAX_WORKERS, timeout=None):
+        return prefetch_broadcast_details(self._api, broadcasts, max_workers=max_workers, timeout=timeout)
+
+
+class BroadcastTimeIndex(object):
+    # per channel: broadcasts sorted by start time plus their start times, so lookups by time are a bisect
+
+    def __init__(self, broadcasts=()):
+        super(BroadcastTimeIndex, self).__init__()
+        self._broadcasts = dict()
+        self._start_timestamps = dict()
+        self.add(broadcasts)
+
+    def add(self, broadcasts):
+        broadcasts_per_channel = collections.defaultdict(dict)
+        for broadcast in broadcasts:
+            broadcasts_per_channel[broadcast.channel_id][broadcast.broadcast_id] = broadcast
+        for channel_id, new_broadcasts in broadcasts_per_channel.items():
+            merged = dict((broadcast.broadcast_id, broadcast) for broadcast in self._broadcasts.get(channel_id, ()))
+            merged.update(new_broadcasts)
+            ordered = sorted(merged.values(), key=operator.attrgetter('start_timestamp'))
+            self._broadcasts[channel_id] = ordered
+            self._start_timestamps[channel_id] = [broadcast.start_timestamp for broadcast in ordered]
+
+    def get_now_and_next(self, channel_id, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        broadcasts = self._broadcasts.get(channel_id) or []
+        i = bisect.bisect_right(self._start_timestamps.get(channel_id) or [], timestamp)
+        now = broadcasts[i - 1] if i > 0 and broadcasts[i - 1].end_timestamp > timestamp else None
+        next = broadcasts[i] if i < len(broadcasts) else None
+        return now, next
+
+    def covers(self, channel_id, timestamp):
+        # True if the index knows what runs on channel_id before and after timestamp
+        start_timestamps = self._start_timestamps.get(channel_id) or []
+        return bool(start_timestamps) and start_timestamps[0] <= timestamp < start_timestamps[-1]
+
 
 class BongGuide(object):
-    def __init__(self, api):
+    def __init__(self, api, search_index=None):
         super(BongGuide, self).__init__()
         if not type(api) is API:
             raise TypeError('expected type "{0}", got "{1}" instead'.format(API, type(api)))
         self._api = api
+        self.search_index = search_index  # filled by whoever fetches the days, e.g. the background service
+        self._channels_by_id = None
+        self._time_index = BroadcastTimeIndex()
+
+    def _get_channel_index(self, timeout=None):
+        # channel_id --> Channel, built once per BongGuide from the (disk cached) channel list
+        if self._channels_by_id is None:
+            data = self._api.list_channels(timeout=timeout)
+            with metrics.timer('models Channel'):
+                self._channels_by_id = dict((channel.channel_id, channel) for channel in (
+                    Channel(channel_data, self._api) for channel_data in data))
+        return self._channels_by_id
 
     def get_channels(self, timeout=None):
-        return sorted([Channel(channel, self._api) for channel in self._api.list_channels(timeout=timeout)],
-                      key=operator.attrgetter('position'))
+        return sorted(self._get_channel_index(timeout=timeout).values(), key=operator.attrgetter('position'))
 
     channels = property(fget=get_channels)
 
     def get_channel(self, channel_id, timeout=None):
-        for channel in self.get_channels(timeout=timeout):
-            if channel.channel_id == int(channel_id):
-                return channel
+        return self._get_channel_index(timeout=timeout).get(int(channel_id))
+
+    def get_broadcast_grid(self, channel_ids=None, offsets=tuple(range(7)), upcoming_only=True,
+                           max_workers=DEFAULT_MAX_WORKERS, timeout=None):
+        # channel x day grid: broadcasts maps (channel_id, offset) to that day's broadcasts, errors the failed cells
+        if channel_ids is None:
+            channels = self.get_channels(timeout=timeout)
+        else:
+            channels = [channel for channel in (self.get_channel(channel_id, timeout=timeout) for channel_id in
+                                                channel_ids) if channel is not None]
+        cells = [(channel, int(offset)) for channel in channels for offset in offsets]
+        results = run_concurrently(lambda (channel, offset): channel.get_broadcasts_per_day(
+            offset=offset, timeout=timeout, upcoming_only=upcoming_only), cells, max_workers=max_workers)
+        return make_broadcast_grid(cells, results)
+
+    def get_broadcast_window(self, start, end, channel_ids=None, max_workers=DEFAULT_MAX_WORKERS, timeout=None):
+        # like get_broadcast_grid(), but per channel the broadcasts running at some point of the window [start, end)
+        if channel_ids is None:
+            channels = self.get_channels(timeout=timeout)
+        else:
+            channels = [channel for channel in (self.get_channel(channel_id, timeout=timeout) for channel_id in
+                                                channel_ids) if channel is not None]
+        return get_broadcast_window(channels, start, end, max_workers=max_workers, timeout=timeout)
+
+    def _update_time_index(self, channel_ids, offsets, max_workers=DEFAULT_MAX_WORKERS, timeout=None):
+        grid = self.get_broadcast_grid(channel_ids=channel_ids, offsets=offsets, upcoming_only=False,
+                                       max_workers=max_workers, timeout=timeout)
+        self._time_index.add(itertools.chain(*grid.broadcasts.values()))
+
+    def get_now_and_next(self, channel_ids=None, timestamp=None, max_workers=DEFAULT_MAX_WORKERS, timeout=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        if channel_ids is None:
+            channels = self.get_channels(timeout=timeout)
+        else:
+            channels = [channel for channel in (self.get_channel(channel_id, timeout=timeout) for channel_id in
+                                                channel_ids) if channel is not None]
+        # the timestamp's day first, the day before/after only for channels where it is not enough (midnight)
+        offset = (datetime.date.fromtimestamp(timestamp) - datetime.date.today()).days
+        for offsets in ((offset, ), (offset - 1, offset + 1)):
+            missing = [channel.channel_id for channel in channels if not self._time_index.covers(
+                channel.channel_id, timestamp)]
+            if missing:
+                self._update_time_index(missing, offsets, max_workers=max_workers, timeout=timeout)
+        return tuple(NowAndNext(channel, *self._time_index.get_now_and_next(channel.channel_id, timestamp=timestamp))
+                     for channel in channels)
 
     def search_broadcasts(self, search_pattern, timeout=None):
         return tuple(Broadcast(data, self._api) for data in self._api.search_broadcasts(search_pattern,
                                                                                         timeout=timeout))
 
-    def search_broadcasts_per_channel(self, search_pattern, channel_id, timeout=None):
-        return tuple(broadcast for broadcast in self.search_broadcasts(search_pattern, timeout=timeout) if
-                     broadcast.channel_id == int(channel_id))
+    def iter_search_broadcasts(self, search_pattern, timeout=None):
+        return (Broadcast(data, self._api) for data in self._api.iter_search_broadcasts(search_pattern,
+                                                                                         timeout=timeout))
+
+    def search_local_broadcasts(self, search_pattern, channel_id=None, start=None, end=None):
+        # searches the indexed broadcasts only, None if there is no SearchIndex. Broadcasts are created on access.
+        if self.search_index is not None:
+            return LazySequence(self.search_index.search(search_pattern, channel_id=channel_id, start=start, end=end),
+                                lambda data: Broadcast(data, self._api))
+
+    def search_all_broadcasts(self, search_pattern, start=None, offsets=tuple(range(7)), timeout=None):
+        # the SearchIndex's broadcasts if it has the days of offsets of all channels, else bong.tv's merged with them.
+        # Merged results are cached for SEARCH_TTL, so that the next pages of them do not search again.
+        local = tuple()
+        if self.search_index is not None:
+            local = self.search_index.search(search_pattern, start=start)
+            if local and self.search_index.covers([channel.channel_id for channel in self.get_channels(
+                    timeout=timeout)], [get_date(offset) for offset in offsets]):
+                return LazySequence(local, lambda data: Broadcast(data, self._api))
+        cache, key = self._api.cache, ResponseCache.make_key('search', dict(query=search_pattern))
+        payload, expires_at = cache.get(key) if cache is not None else (None, None)
+        if payload is None or expires_at is None or time.time() >= expires_at:
+            try:
+                remote = list(self._api.iter_search_broadcasts(search_pattern, timeout=timeout))
+            except UnavailableError:
+                if not local:
+                    raise
+                remote = None  # what the index knows is better than nothing, but not worth caching
+            payload = dict((data['id'], data) for data in itertools.chain(local, remote or ())).values()
+            payload.sort(key=operator.itemgetter('starts_at_ms'))
+            if cache is not None and remote is not None:
+                cache.set(key, payload, ttl=SEARCH_TTL)
+        return LazySequence(payload, lambda data: Broadcast(data, self._api))
+
+    def prefetch_broadcast_details(self, broadcasts, max_workers=DEFAULT_MAX_WORKERS, timeout=None):
+        return prefetch_broadcast_details(self._api, broadcasts, max_workers=max_workers, timeout=timeout)
 
     def __enter__(self):
         return self
@@ -435,38 +2235,227 @@ class BongGuide(object):
         return False
 
 
+class RecordingsSnapshot(object):
+    # recordings sorted by start time plus the views the PVR pages need, computed once per snapshot
+
+    def __init__(self, recordings=()):
+        super(RecordingsSnapshot, self).__init__()
+        self._update(recordings)
+
+    def _update(self, recordings):
+        self.recordings = tuple(sorted(recordings, key=operator.attrgetter('start_timestamp')))
+        self.recorded = tuple(recording for recording in self.recordings if recording.is_recorded())
+        self.scheduled = tuple(recording for recording in self.recordings if recording.is_scheduled())
+        self.by_id = dict((recording.recording_id, recording) for recording in self.recordings)
+        by_channel = collections.defaultdict(list)
+        for recording in self.recordings:
+            by_channel[recording.channel_id].append(recording)
+        self.by_channel = dict((channel_id, tuple(recordings)) for channel_id, recordings in by_channel.items())
+
+    def add(self, recording):
+        self._update([r for r in self.recordings if r.recording_id != recording.recording_id] + [recording])
+
+    def remove(self, recording_id):
+        if int(recording_id) in self.by_id:
+            self._update([r for r in self.recordings if r.recording_id != int(recording_id)])
+
+    def __len__(self):
+        return len(self.recordings)
+
+    def __iter__(self):
+        return iter(self.recordings)
+
+
 class BongSpace(object):
     def __init__(self, api):
         super(BongSpace, self).__init__()
         if not type(api) is API:
             raise TypeError('expected type "{0}", got "{1}" instead'.format(API, type(api)))
         self._api = api
+        self._snapshot = None
+
+    def get_snapshot(self, timeout=None):
+        # built once per BongSpace and kept up to date by create/delete_recording
+        if self._snapshot is None:
+            self._snapshot = RecordingsSnapshot(self.iter_recordings(timeout=timeout))
+        return self._snapshot
+
+    def iter_recordings(self, timeout=None):
+        # unsorted, recordings are yielded as they come in
+        return (Recording(data, self._api) for data in self._api.iter_user_recordings(timeout=timeout))
 
     def get_recordings(self, timeout=None):
-        return sorted([Recording(recording, self._api) for recording in self._api.list_user_recordings(
-            timeout=timeout)], key=operator.attrgetter('starts_at'))
+        return list(self.get_snapshot(timeout=timeout).recordings)
 
     recordings = property(fget=get_recordings)
 
     def create_recording(self, broadcast_id):
-        return Recording(self._api.create_recording(int(broadcast_id)), self._api)
+        recording = Recording(self._api.create_recording(int(broadcast_id)), self._api)
+        if self._snapshot is not None:
+            self._snapshot.add(recording)
+        return recording
 
     def get_recording(self, recording_id, timeout=None):
-        for recording in self.get_recordings(timeout=timeout):
-            if recording.recording_id == int(recording_id):
-                return recording
+        return self.get_snapshot(timeout=timeout).by_id.get(int(recording_id))
 
     def delete_recording(self, recording_id, timeout=None):
+        self._delete_recording(int(recording_id), timeout=timeout)
+        if self._snapshot is not None:
+            self._snapshot.remove(recording_id)
+
+    def _create_recording(self, broadcast_id, timeout=None):
+        return Recording(self._api.create_recording(broadcast_id, timeout=timeout), self._api)
+
+    def _delete_recording(self, recording_id, timeout=None):
         try:
-            self._api.delete_recording(int(recording_id), timeout=timeout)
+            self._api.delete_recording(recording_id, timeout=timeout)
         except NotFoundError:
             pass  # no such recording --> ignore
 
+    def _created(self, broadcast_ids, results):
+        # adds the new recordings to the snapshot, one BulkResult per broadcast_id
+        for recording, error in results:
+            if error is None and self._snapshot is not None:
+                self._snapshot.add(recording)
+        return tuple(BulkResult(broadcast_id, recording, error) for broadcast_id, (recording, error) in
+                     zip(broadcast_ids, results))
+
+    def _deleted(self, recording_ids, results):
+        # removes the deleted recordings from the snapshot, one BulkResult per recording_id
+        for recording_id, (_, error) in zip(recording_ids, results):
+            if error is None and self._snapshot is not None:
+                self._snapshot.remove(recording_id)
+        return tuple(BulkResult(recording_id, None, error) for recording_id, (_, error) in
+                     zip(recording_ids, results))
+
+    def create_recordings(self, broadcast_ids, max_workers=DEFAULT_MAX_WORKERS, timeout=None):
+        # one BulkResult per broadcast_id, result is the new Recording
+        broadcast_ids = [int(broadcast_id) for broadcast_id in broadcast_ids]
+        return self._created(broadcast_ids, run_concurrently(lambda broadcast_id: self._create_recording(
+            broadcast_id, timeout=timeout), broadcast_ids, max_workers=max_workers))
+
+    def delete_recordings(self, recording_ids, max_workers=DEFAULT_MAX_WORKERS, timeout=None):
+        # one BulkResult per recording_id, result is always None
+        recording_ids = [int(recording_id) for recording_id in recording_ids]
+        return self._deleted(recording_ids, run_concurrently(lambda recording_id: self._delete_recording(
+            recording_id, timeout=timeout), recording_ids, max_workers=max_workers))
+
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         return False
 
+
+class AsyncBongGuide(object):
+    # BongGuide whose methods return Futures of the same Channel and Broadcast objects, fanning out on an EventLoop
+
+    def __init__(self, api, loop=None):
+        super(AsyncBongGuide, self).__init__()
+        self._guide = BongGuide(api)
+        self._api = api
+        self._loop = loop or get_event_loop()
+
+    def get_channels(self, timeout=None):
+        return self._loop.submit(self._guide.get_channels, timeout=timeout)
+
+    def get_channel(self, channel_id, timeout=None):
+        return self._loop.submit(self._guide.get_channel, channel_id, timeout=timeout)
+
+    def _get_channels(self, channel_ids, timeout=None):
+        if channel_ids is None:
+            return self.get_channels(timeout=timeout)
+        return self._loop.submit(lambda: [channel for channel in (self._guide.get_channel(
+            channel_id, timeout=timeout) for channel_id in channel_ids) if channel is not None])
+
+    def get_broadcasts_per_day(self, channel_id, offset=0, timeout=None, upcoming_only=True):
+        # a Future of None if there is no such channel
+        return self.get_channel(channel_id, timeout=timeout).then(lambda channel: None if channel is None else (
+            self._loop.submit(channel.get_broadcasts_per_day, offset=offset, timeout=timeout,
+                              upcoming_only=upcoming_only)))
+
+    def get_broadcast_grid(self, channel_ids=None, offsets=tuple(range(7)), upcoming_only=True,
+                           limit=DEFAULT_MAX_WORKERS, timeout=None):
+        def fetch(channels):
+            cells = [(channel, int(offset)) for channel in channels for offset in offsets]
+            return self._loop.map(lambda (channel, offset): channel.get_broadcasts_per_day(
+                offset=offset, timeout=timeout, upcoming_only=upcoming_only), cells, limit=limit).then(
+                lambda results: make_broadcast_grid(cells, results))
+
+        return self._get_channels(channel_ids, timeout=timeout).then(fetch)
+
+    def get_broadcast_window(self, start, end, channel_ids=None, timeout=None):
+        return self._loop.submit(self._guide.get_broadcast_window, start, end, channel_ids=channel_ids,
+                                 timeout=timeout)
+
+    def get_now_and_next(self, channel_ids=None, timestamp=None, timeout=None):
+        return self._loop.submit(self._guide.get_now_and_next, channel_ids=channel_ids, timestamp=timestamp,
+                                 timeout=timeout)
+
+    def search_broadcasts(self, search_pattern, timeout=None):
+        return self._loop.submit(self._guide.search_broadcasts, search_pattern, timeout=timeout)
+
+    def prefetch_broadcast_details(self, broadcasts, limit=DEFAULT_MAX_WORKERS, timeout=None):
+        # a Future of the broadcasts whose details could not be fetched, like BongGuide.prefetch_broadcast_details()
+        broadcasts = [broadcast for broadcast in broadcasts if not broadcast.has_broadcast_details()]
+        return self._loop.map(lambda broadcast: self._api.get_broadcast_details(
+            broadcast.broadcast_id, timeout=timeout), broadcasts, limit=limit).then(
+            lambda results: assign_broadcast_details(broadcasts, results))
+
+
+class AsyncBongSpace(object):
+    # BongSpace whose methods return Futures of the same Recording objects, bulk operations fan out on an EventLoop
+
+    def __init__(self, api, loop=None):
+        super(AsyncBongSpace, self).__init__()
+        self._space = BongSpace(api)
+        self._api = api
+        self._loop = loop or get_event_loop()
+        self._snapshot_lock = threading.Lock()  # bulk operations complete on different workers
+
+    def get_snapshot(self, timeout=None):
+        return self._loop.submit(self._space.get_snapshot, timeout=timeout)
+
+    def get_recordings(self, timeout=None):
+        return self._loop.submit(self._space.get_recordings, timeout=timeout)
+
+    def get_recording(self, recording_id, timeout=None):
+        return self._loop.submit(self._space.get_recording, recording_id, timeout=timeout)
+
+    @staticmethod
+    def _single(bulk_results):
+        if bulk_results[0].error is not None:
+            raise bulk_results[0].error
+        return bulk_results[0].result
+
+    def create_recording(self, broadcast_id, timeout=None):
+        return self.create_recordings([broadcast_id], timeout=timeout).then(self._single)
+
+    def delete_recording(self, recording_id, timeout=None):
+        return self.delete_recordings([recording_id], timeout=timeout).then(self._single)
+
+    def create_recordings(self, broadcast_ids, limit=DEFAULT_MAX_WORKERS, timeout=None):
+        # a Future of one BulkResult per broadcast_id, like BongSpace.create_recordings()
+        broadcast_ids = [int(broadcast_id) for broadcast_id in broadcast_ids]
+
+        def update(results):
+            with self._snapshot_lock:
+                return self._space._created(broadcast_ids, results)
+
+        return self._loop.map(lambda broadcast_id: self._space._create_recording(
+            broadcast_id, timeout=timeout), broadcast_ids, limit=limit).then(update)
+
+    def delete_recordings(self, recording_ids, limit=DEFAULT_MAX_WORKERS, timeout=None):
+        # a Future of one BulkResult per recording_id, like BongSpace.delete_recordings()
+        recording_ids = [int(recording_id) for recording_id in recording_ids]
+
+        def update(results):
+            with self._snapshot_lock:
+                return self._space._deleted(recording_ids, results)
+
+        return self._loop.map(lambda recording_id: self._space._delete_recording(
+            recording_id, timeout=timeout), recording_ids, limit=limit).then(update)
+
+
 EPG = BongGuide
 PVR = BongSpace
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015 Christian Maugg
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+
+Background service which keeps the addon's cache warm: the channel list, the next days of broadcasts and the
+recordings list are fetched ahead of time, so that the addon's pages rarely have to wait for bong.tv.
+"""
+
+import collections
+import os
+import random
+import struct
+import sys
+import time
+import traceback
+import xbmc
+import xbmcaddon
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'resources', 'lib'))
+
+import common
+import pybongtvapi
+
+addon = xbmcaddon.Addon()
+addon_id = addon.getAddonInfo('id')
+
+# same location as xbmcswift2's plugin.storage_path used by addon.py
+common.configure(xbmc.translatePath('special://profile/addon_data/{0}/.storage/'.format(addon_id)))
+
+BUSY_RETRY_INTERVAL = 5 * 60  # seconds to wait while a video is playing
+IMAGE_PREFETCH_BATCH_SIZE = 10  # images downloaded between two throttle() calls
+IMAGE_PREFETCH_WORKERS = 2
+SNAPSHOT_GRACE_PERIOD = 30 * 60  # seconds a round may take before the addon stops trusting the last snapshot
+
+
+class Busy(Exception):
+    pass
+
+
+def log(msg, level=xbmc.LOGDEBUG):
+    xbmc.log('[{0}] {1}'.format(addon_id, msg), level=level)
+
+
+def get_setting(setting_id, converter=str):
+    value = addon.getSetting(setting_id)
+    if converter is bool:
+        return value == 'true'
+    return converter(value) if value else converter()
+
+
+def get_channel_ids():
+    channel_ids = get_setting('prewarm_channels').replace(';', ',').split(',')
+    return [int(channel_id) for channel_id in channel_ids if channel_id.strip().isdigit()] or None
+
+
+def new_api():
+    # no time budget, a round may take as long as it needs
+    return common.new_api(get_setting, stale_while_revalidate=False, policy=common.get_transport_policy(get_setting))
+
+
+def throttle(monitor, player):
+    # waits between two requests, a random jitter keeps several boxes from hitting bong.tv in lockstep
+    delay = get_setting('prewarm_request_delay', converter=float)
+    if monitor.waitForAbort(delay * random.uniform(0.5, 1.5)) or player.isPlayingVideo():
+        raise Busy()
+
+
+def prefetch_images(urls, monitor, player):
+    # in batches, each one throttled. Stops short of the size limit: the images the addon shows must not be evicted
+    # for ones which may never be shown.
+    image_cache_size = get_setting('image_cache_size', converter=int) * 1024 * 1024
+    if image_cache_size > 0:
+        image_cache = pybongtvapi.ImageCache(max_size=image_cache_size)
+        try:
+            urls = [url for url in collections.OrderedDict.fromkeys(urls) if url and image_cache.get(url) is None]
+            for i in range(0, len(urls), IMAGE_PREFETCH_BATCH_SIZE):
+                if image_cache.get_size() >= image_cache_size * pybongtvapi.CACHE_LOW_WATER_MARK:
+                    log('image cache full, {0} images not prefetched'.format(len(urls) - i))
+                    break
+                throttle(monitor, player)
+                image_cache.prefetch(urls[i:i + IMAGE_PREFETCH_BATCH_SIZE], max_workers=IMAGE_PREFETCH_WORKERS)
+        finally:
+            image_cache.close()
+
+
+def write_guide_snapshot(days):
+    # the addon reads its EPG pages from the snapshot instead of parsing the cached JSON, until the next round is due
+    expires_at = time.time() + get_setting('prewarm_interval', converter=int) * 60 + SNAPSHOT_GRACE_PERIOD
+    try:
+        pybongtvapi.GuideSnapshot.write(days, expires_at=expires_at)
+    except EnvironmentError as error:  # e.g. windows, while the addon has the snapshot open
+        log('cannot write the guide snapshot: {0}'.format(error), level=xbmc.LOGWARNING)
+    except (ValueError, struct.error) as error:  # a value which does not fit into its column
+        log('cannot write the guide snapshot: {0}'.format(error), level=xbmc.LOGERROR)
+
+
+def prewarm(monitor, player):
+    api = new_api()
+    if api.cache is None:
+        return  # nowhere to keep anything
+    search_index = common.new_search_index(get_setting)  # the addon only searches it
+    try:
+        guide = pybongtvapi.BongGuide(api)
+        channels = guide.get_channels()
+        channel_ids = get_channel_ids()
+        if channel_ids is not None:
+            channels = [channel for channel in channels if channel.channel_id in channel_ids]
+        time_index = pybongtvapi.BroadcastTimeIndex()
+        days = list()
+        for offset in range(get_setting('prewarm_days', converter=int)):
+            date = pybongtvapi.get_date(offset)
+            for channel in channels:
+                throttle(monitor, player)
+                broadcasts = api.get_broadcasts(channel.channel_id, date)
+                days.append((channel.channel_id, date, broadcasts))
+                if search_index is not None:
+                    search_index.add_day(channel.channel_id, date, broadcasts)
+                if offset < 2:  # what is on now and next, also shortly before midnight
+                    time_index.add(pybongtvapi.Broadcast(data, api) for data in broadcasts)
+        write_guide_snapshot(days)
+        # the logos and the thumbnails of the EPG's now and next page, those of all broadcasts would not fit
+        image_urls = [channel.logo_url for channel in channels]
+        for channel in channels:
+            image_urls.extend(broadcast.thumb_url for broadcast in time_index.get_now_and_next(channel.channel_id) if
+                              broadcast is not None)
+        prefetch_images(image_urls, monitor, player)
+        if get_setting('username') and get_setting('password'):
+            throttle(monitor, player)
+            api.list_user_recordings()
+    finally:
+        if search_index is not None:
+            search_index.prune()
+            search_index.close()
+        api.close()
+
+
+def main():
+    monitor = xbmc.Monitor()
+    player = xbmc.Player()
+    interval = BUSY_RETRY_INTERVAL
+    while not monitor.abortRequested():
+        if get_setting('prewarm', converter=bool):
+            if player.isPlayingVideo():
+                interval = BUSY_RETRY_INTERVAL
+            else:
+                try:
+                    prewarm(monitor, player)
+                except Busy:
+                    log('playback started, postponing pre-warming')
+                    interval = BUSY_RETRY_INTERVAL
+                except pybongtvapi.Error as error:
+                    log('pre-warming failed: {0}'.format(error), level=xbmc.LOGWARNING)
+                    interval = get_setting('prewarm_interval', converter=int) * 60
+                except Exception:  # e.g. a broken cache or snapshot write, the next round may do better
+                    log('pre-warming failed: {0}'.format(traceback.format_exc()), level=xbmc.LOGERROR)
+                    interval = get_setting('prewarm_interval', converter=int) * 60
+                else:
+                    log('pre-warming done')
+                    interval = get_setting('prewarm_interval', converter=int) * 60
+        if monitor.waitForAbort(max(interval, 60)):
+            break
+
+
+if __name__ == '__main__':
+    main()